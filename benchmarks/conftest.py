@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import sys
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "tests"))
+
+from synthetic_historian import SyntheticHistorian  # noqa: E402
+
+LOCATIONS = [10, 50, 200]
+
+
+@pytest.fixture(params=LOCATIONS, ids=lambda locations: f"{locations}_locations")
+def historian(request, monkeypatch, tmp_path):
+    return SyntheticHistorian(locations=request.param).install(
+        monkeypatch, tmp_path / "rollup.sqlite"
+    )
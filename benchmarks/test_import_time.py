@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Start-up cost of the command line, measured with ``python -X importtime``"""
+from __future__ import annotations
+
+import subprocess
+import sys
+
+CLI = "reports.bin.report_app"
+# Only loaded once a subcommand that needs them runs.
+HEAVY = (
+    "pandas",
+    "matplotlib",
+    "numexpr",
+    "smtplib",
+    "email.mime",
+    "reports.models",
+    "reports.templates",
+)
+
+
+def import_times(module):
+    """Cumulative import time in microseconds of everything ``module`` imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_imports_nothing_heavy():
+    heavy = [
+        name
+        for name in import_times(CLI)
+        if any(name == root or name.startswith(f"{root}.") for root in HEAVY)
+    ]
+    assert heavy == []
+
+
+def test_bench_cli_import(benchmark):
+    times = benchmark.pedantic(import_times, args=(CLI,), rounds=5)
+    benchmark.extra_info["cumulative_us"] = times[CLI]
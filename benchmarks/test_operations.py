@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Each report operation and the tank volume export against the synthetic historian"""
+from __future__ import annotations
+
+from reports.models import (
+    location_consumption_model,
+    location_production_model,
+    summary_production_model,
+)
+from reports.utilities.derived import DerivedColumns
+
+ROUNDS = 3
+
+
+def test_bench_summary_production(benchmark, historian):
+    figures = benchmark.pedantic(
+        summary_production_model.operation,
+        args=(historian.get_location_data,),
+        rounds=ROUNDS,
+    )
+    assert len(figures) == 1
+
+
+def test_bench_location_consumption(benchmark, historian):
+    consum_figures, _ = benchmark.pedantic(
+        location_consumption_model.operation,
+        args=(historian.get_location_data,),
+        rounds=ROUNDS,
+    )
+    assert consum_figures
+
+
+def test_bench_location_production(benchmark, historian):
+    # A fresh cache each round so shared columns are computed, not just looked up.
+    product_figures, inlet_figures = benchmark.pedantic(
+        location_production_model.operation,
+        setup=lambda: (
+            (historian.get_location_data,),
+            {"derived": DerivedColumns()},
+        ),
+        rounds=ROUNDS,
+    )
+    assert product_figures and inlet_figures
+
+
+def test_bench_tank_volume(benchmark, historian, monkeypatch, tmp_path):
+    from reports.spotfire import tank_measurement
+
+    historian.patch(monkeypatch, tank_measurement)
+    results = benchmark.pedantic(
+        tank_measurement.get_tank_volume,
+        kwargs={"output_root": tmp_path, "export_format": "parquet"},
+        rounds=ROUNDS,
+    )
+    assert not any(result.status == "failed" for result in results)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Peak marking in get_tank_volume against the per-peak boolean mask it replaced"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reports.spotfire.tank_measurement import mark_peaks
+
+
+def noisy_tank(cycles):
+    """A day of minute tank levels drained and refilled ``cycles`` times."""
+    index = pd.date_range("2021-08-01 07:00", periods=1441, freq="min")
+    rng = np.random.default_rng(cycles)
+    level = 500 - (np.arange(len(index)) % (len(index) // cycles)) * 2.0
+    data = pd.DataFrame({"tank_volume": level + rng.normal(0, 3, len(index))}, index)
+    data["datetime"] = data.index
+
+    fill_times = index[:: len(index) // cycles][1:]
+    fwd = [{"row_num": 1, "peak_min_time": time} for time in fill_times]
+    bkwd = [
+        {"row_num": 1, "peak_min_time": time - pd.Timedelta(minutes=1)}
+        for time in fill_times
+    ]
+    return data, fwd, bkwd
+
+
+def mark_peaks_by_mask(data, valid_fwd_values, valid_bkwd_values):
+    data["peak_locs"] = [0] * len(data)
+    if valid_fwd_values[0]["row_num"] != 0 and valid_bkwd_values[0]["row_num"] != 0:
+        for fwd_row, bkwd_row in zip(valid_fwd_values, valid_bkwd_values):
+            data.loc[data.datetime == fwd_row["peak_min_time"], "peak_locs"] = 1
+            data.loc[data.datetime == bkwd_row["peak_min_time"], "peak_locs"] = 1
+    return data
+
+
+@pytest.mark.parametrize("cycles", [4, 48, 240])
+def test_indexed_matches_mask(cycles):
+    data, fwd, bkwd = noisy_tank(cycles)
+
+    expected = mark_peaks_by_mask(data.copy(), fwd, bkwd).peak_locs
+    assert mark_peaks(data.copy(), fwd, bkwd).peak_locs.equals(expected)
+    assert expected.sum() == 2 * len(fwd)
+
+
+@pytest.mark.parametrize("cycles", [4, 48, 240])
+def test_bench_mark_peaks_indexed(benchmark, cycles):
+    data, fwd, bkwd = noisy_tank(cycles)
+    benchmark(mark_peaks, data, fwd, bkwd)
+
+
+@pytest.mark.parametrize("cycles", [4, 48, 240])
+def test_bench_mark_peaks_mask(benchmark, cycles):
+    data, fwd, bkwd = noisy_tank(cycles)
+    benchmark(mark_peaks_by_mask, data, fwd, bkwd)
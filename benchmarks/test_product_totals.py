@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Summary totals computed once per location against the per-bucket calls they replaced"""
+from __future__ import annotations
+
+import datetime as dt
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_tools.utilities.alter_table import calculate_product_totals
+from reports.models.summary_production_model import (
+    CONNECTION_TYPE,
+    DESIGNATION,
+    NAME,
+    designation_panels,
+    location_product_data,
+)
+from reports.utilities.registry import get_registry
+from reports.utilities.rollup_store import LocationTotals
+
+START = dt.datetime(2021, 8, 1)
+END = dt.datetime(2021, 8, 2)
+
+
+def synthetic_fetch(location, tags, cols, start_date, end_date, trucked, **_):
+    index = pd.date_range(start_date, end_date, freq="min")
+    rng = np.random.default_rng(len(index))
+    return pd.DataFrame(
+        {col: rng.uniform(50, 150, len(index)) for col in cols}, index=index
+    )
+
+
+def product_frames(locations):
+    """Prepared product data of ``locations`` real locations, repeated as needed."""
+    real = list(get_registry())
+    frames = {
+        location: location_product_data(location, START, END, synthetic_fetch)
+        for location in real
+    }
+    return [
+        (location, frames[location])
+        for location in itertools.islice(itertools.cycle(real), locations)
+    ]
+
+
+def per_bucket_totals(frames):
+    upper_product_total, upper_pumped, upper_locations = [], [], []
+    lower_product_total, lower_pumped, lower_locations = [], [], []
+    location_type_a, location_type_b = [], []
+    for location, product_data in frames:
+        if CONNECTION_TYPE(location) == "connection_1":
+            location_type_b.append(calculate_product_totals(location, product_data)[0])
+        else:
+            location_type_a.append(calculate_product_totals(location, product_data)[0])
+        if DESIGNATION(location) == "UPPER":
+            total, pumped = calculate_product_totals(location, product_data)
+            upper_product_total.append(total if total > 0 else 0)
+            upper_pumped.append(pumped)
+            upper_locations.append(NAME(location))
+        if DESIGNATION(location) == "LOWER":
+            total, pumped = calculate_product_totals(location, product_data)
+            lower_product_total.append(total if total > 0 else 0)
+            lower_pumped.append(pumped)
+            lower_locations.append(NAME(location))
+    return upper_locations, upper_product_total, lower_locations, lower_product_total
+
+
+def once_totals(frames):
+    totals = [
+        LocationTotals(
+            location,
+            NAME(location),
+            CONNECTION_TYPE(location),
+            DESIGNATION(location),
+            *calculate_product_totals(location, product_data),
+        )
+        for location, product_data in frames
+    ]
+    panels = designation_panels(totals)
+    upper, lower = panels["UPPER"], panels["LOWER"]
+    return (
+        upper.name.tolist(),
+        upper.product_total.tolist(),
+        lower.name.tolist(),
+        lower.product_total.tolist(),
+    )
+
+
+def test_once_matches_per_bucket():
+    frames = product_frames(len(get_registry()))
+    assert once_totals(frames) == per_bucket_totals(frames)
+
+
+@pytest.mark.parametrize("locations", [120, 480])
+def test_bench_totals_once(benchmark, locations):
+    benchmark(once_totals, product_frames(locations))
+
+
+@pytest.mark.parametrize("locations", [120, 480])
+def test_bench_totals_per_bucket(benchmark, locations):
+    benchmark(per_bucket_totals, product_frames(locations))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Each plot template and the PDF attachment of a full report"""
+from __future__ import annotations
+
+import matplotlib.pyplot as plt
+import pytest
+
+from reports.email.email_utils import EmailMsg
+from reports.models import (
+    location_consumption_model,
+    location_production_model,
+    summary_production_model,
+)
+from reports.templates.render import FAST_TEMPLATES, build_figure
+
+ROUNDS = 3
+
+
+@pytest.fixture
+def figures(historian):
+    """The figure specs of a report over the historian's locations."""
+    fetch = historian.get_location_data
+    product, inlet = location_production_model.operation(fetch)
+    consum, measured = location_consumption_model.operation(fetch)
+    return {
+        "product_summary_plot": summary_production_model.operation(fetch),
+        "product_plot": product,
+        "inlet_plot": inlet,
+        "consum_plot": consum,
+        "consum_measured_analysis": measured,
+    }
+
+
+def build_and_close(specs, fast=False):
+    for spec in specs:
+        plt.close(build_figure(spec, fast))
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "product_summary_plot",
+        "product_plot",
+        "inlet_plot",
+        "consum_plot",
+        "consum_measured_analysis",
+    ],
+)
+@pytest.mark.parametrize("fast", [False, True], ids=["default", "fast"])
+def test_bench_template(benchmark, figures, template, fast):
+    specs = figures[template]
+    if not specs:
+        pytest.skip(f"no {template} pages for these locations")
+    if fast and template not in FAST_TEMPLATES:
+        pytest.skip(f"{template} has no fast mode")
+    # Default and fast runs of a template are compared side by side.
+    benchmark.group = template
+    benchmark.pedantic(build_and_close, args=(specs, fast), rounds=ROUNDS)
+
+
+def test_bench_convert_plots_to_attachment(benchmark, figures):
+    specs = [spec for group in figures.values() for spec in group]
+
+    def attach():
+        email = EmailMsg(["bench@company.com"], "Benchmark")
+        email.convert_plots_to_attachment("report.pdf", list(specs))
+        return email
+
+    benchmark.pedantic(attach, rounds=ROUNDS)
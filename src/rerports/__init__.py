@@ -10,13 +10,3 @@ __version__ = "0.8.0"
 
 
 __maintainer__ = "User 1"
-
-import os
-
-from dotenv import load_dotenv
-
-load_dotenv()
-if os.getenv("DEBUG") is not None:
-    print("DEBUG: " + os.getenv("DEBUG"))
-else:
-    print(os.getenv("DEBUG"))
@@ -1,28 +1,189 @@
 # -*- coding: utf-8 -*-
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 import typer
 
-from reports.config import get_logger, set_logging
-from reports.controllers.run_report import generate_master
-from reports.spotfire.tank_measurement import get_tank_volume
+from reports.config import get_logger, set_instrumentation, set_logging
+from reports.settings import (
+    DELIVERY_DEADLINE,
+    FETCH_TIMEOUT,
+    FETCH_WORKERS,
+    LOCATION_TIMEOUT,
+    METRICS_ROOT,
+    OUTPUT_ROOT,
+    PAGE_CACHE_ROOT,
+    PROFILE_ROOT,
+    ROLLUP_DB,
+    RUNS_ROOT,
+    STORE_ROOT,
+)
 
 logger = get_logger(__name__)
 
 app = typer.Typer()
 
 
+def stage_profiler(profile: Optional[str], profile_out: Path, name: str):
+    if profile is None:
+        return None
+    from reports.utilities.profiling import PROFILE_MODES, StageProfiler, profile_dir
+
+    if profile not in PROFILE_MODES:
+        raise typer.BadParameter(f"--profile must be one of {PROFILE_MODES}")
+    return StageProfiler(profile_dir(profile_out, name), profile).start()
+
+
 @app.command("master-report")
-def master_report(logging_file: Optional[Path] = None):
+def master_report(
+    logging_file: Optional[Path] = None,
+    fetch_workers: int = typer.Option(
+        FETCH_WORKERS, help="Historian requests to run at once."
+    ),
+    fetch_timeout: float = typer.Option(
+        FETCH_TIMEOUT, help="Seconds each historian request may take."
+    ),
+    render_processes: Optional[int] = typer.Option(
+        None, help="Render PDF pages in this many worker processes."
+    ),
+    fast_render: bool = typer.Option(
+        False, help="Skip tick and text work the time series pages throw away."
+    ),
+    page_cache: Path = typer.Option(
+        PAGE_CACHE_ROOT, help="Folder that keeps rendered pages between runs."
+    ),
+    use_page_cache: bool = typer.Option(
+        True, help="Only render pages whose data changed since the last run."
+    ),
+    minute_store: Path = typer.Option(
+        STORE_ROOT, help="Folder that keeps historian minute data between runs."
+    ),
+    use_minute_store: bool = typer.Option(
+        True, help="Read complete days from the minute store."
+    ),
+    metrics_dir: Path = typer.Option(
+        METRICS_ROOT, help="Folder for the per-stage timing report of each run."
+    ),
+    profile: Optional[str] = typer.Option(
+        None,
+        help="Profile each stage with 'cprofile' (main thread only) or "
+        "'sampling' (every thread, including the model and fetch workers).",
+    ),
+    profile_out: Path = typer.Option(
+        PROFILE_ROOT, help="Folder the profile of each run is written under."
+    ),
+    run_dir: Path = typer.Option(
+        RUNS_ROOT, help="Folder each run keeps its stage artifacts under."
+    ),
+    resume: bool = typer.Option(
+        False, help="Pick up the day's run after its last completed stage."
+    ),
+    location_timeout: float = typer.Option(
+        LOCATION_TIMEOUT, help="Seconds each location gets in each model."
+    ),
+    summary_first: bool = typer.Option(
+        False, help="Send the summary pages to the supervisors before the rest."
+    ),
+    deadline: datetime = typer.Option(
+        DELIVERY_DEADLINE,
+        formats=["%H:%M"],
+        help="With --summary-first, the time the full report is due.",
+    ),
+):
+    from reports.controllers.run_report import generate_master
+
     set_logging(logging_file, log=True)
     logger.info("Starting master report")
-    generate_master()
+    profiler = stage_profiler(profile, profile_out, "master_report")
+    try:
+        generate_master(
+            fetch_workers,
+            fetch_timeout,
+            render_processes,
+            minute_store if use_minute_store else None,
+            metrics_dir,
+            profiler,
+            fast_render=fast_render,
+            page_cache=page_cache if use_page_cache else None,
+            run_dir=run_dir,
+            resume=resume,
+            location_timeout=location_timeout,
+            summary_first=summary_first,
+            deadline=deadline.time() if summary_first else None,
+        )
+    finally:
+        if profiler is not None:
+            profiler.stop()
 
 
 @app.command("tank-volume")
-def tank_volume():
-    get_tank_volume()
+def tank_volume(
+    output_root: Path = typer.Option(OUTPUT_ROOT, help="Folder to write exports to."),
+    export_format: str = typer.Option(
+        "csv", help="csv (a file per tank) or parquet (one dataset)."
+    ),
+    new_days_only: bool = typer.Option(
+        False, help="Skip report dates already in the parquet dataset."
+    ),
+    workers: Optional[int] = typer.Option(
+        None, help="Run locations and chemicals in parallel with this many workers."
+    ),
+    location_timeout: float = typer.Option(
+        LOCATION_TIMEOUT, help="Seconds each fetch, inference and write gets."
+    ),
+    profile: Optional[str] = typer.Option(
+        None,
+        help="Profile each stage with 'cprofile' (main thread only) or "
+        "'sampling' (every thread, including the model and fetch workers).",
+    ),
+    profile_out: Path = typer.Option(
+        PROFILE_ROOT, help="Folder the profile of each run is written under."
+    ),
+):
+    from reports.spotfire.tank_measurement import get_tank_volume
+    from reports.utilities.instrumentation import span
+
+    profiler = stage_profiler(profile, profile_out, "tank_volume")
+    if profiler is not None:
+        set_instrumentation(name="tank_volume").listeners.append(profiler)
+    try:
+        with span("tank_volume"):
+            results = get_tank_volume(
+                output_root, export_format, new_days_only, workers, location_timeout
+            )
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            set_instrumentation(False)
+    if any(result.status == "failed" for result in results):
+        raise typer.Exit(code=1)
+
+
+@app.command("rollup-backfill")
+def rollup_backfill(
+    start: datetime = typer.Option(..., formats=["%Y-%m-%d"], help="First day."),
+    end: datetime = typer.Option(..., formats=["%Y-%m-%d"], help="Last day."),
+    rollup_db: Path = typer.Option(ROLLUP_DB, help="Daily production rollup file."),
+    minute_store: Path = typer.Option(
+        STORE_ROOT, help="Folder that keeps historian minute data between runs."
+    ),
+    fetch_workers: int = typer.Option(
+        FETCH_WORKERS, help="Historian requests to run at once."
+    ),
+):
+    """Rebuild the daily production rollup for every day from start to end."""
+    from reports.models import summary_production_model
+    from reports.utilities.minute_store import MinuteStore
+    from reports.utilities.rollup_store import RollupStore
+
+    summary_production_model.backfill(
+        start.date(),
+        end.date(),
+        MinuteStore(minute_store).get_location_data,
+        RollupStore(rollup_db),
+        fetch_workers,
+    )
 
 
 def main():
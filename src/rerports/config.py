@@ -1,25 +1,39 @@
 import logging
-import logging.config
-import logging.handlers
+import os
 import sys
 
 from pathlib import Path
 from typing import Optional
 
-
-import toml
-
 LOGGERS = {}
 LOGGING = False
+INSTRUMENTATION = None
+ENVIRONMENT = False
 
 
-def set_logging(logging: Optional[Path] = None, log=False):
+def load_environment():
+    """Read ``.env`` into the environment once, before any setting is read."""
+    global ENVIRONMENT
+    if ENVIRONMENT:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    ENVIRONMENT = True
+    if os.getenv("DEBUG") is not None:
+        print("DEBUG: " + os.getenv("DEBUG"))
+
+
+def set_logging(logging_file: Optional[Path] = None, log=False):
     if not log:
         return
 
-    if logging is not None:
-        config = toml.load(logging)
-        logging.config.dictConfig(config)
+    if logging_file is not None:
+        from logging.config import dictConfig
+
+        import toml
+
+        dictConfig(toml.load(logging_file))
 
     global LOGGING
     LOGGING = True
@@ -35,6 +49,22 @@ def set_logging(logging: Optional[Path] = None, log=False):
             logger.addHandler(v)
 
 
+def set_instrumentation(enabled: bool = True, name: str = "run"):
+    """Start recording spans for a new run, or stop recording with ``False``."""
+    global INSTRUMENTATION
+    if enabled:
+        from reports.utilities.instrumentation import Instrumentation
+
+        INSTRUMENTATION = Instrumentation(name)
+    else:
+        INSTRUMENTATION = None
+    return INSTRUMENTATION
+
+
+def get_instrumentation():
+    return INSTRUMENTATION
+
+
 def get_logger(name):
     global LOGGERS
     global LOGGING
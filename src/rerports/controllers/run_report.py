@@ -2,58 +2,369 @@
 # %%
 import datetime as dt
 
-from reports.config import get_logger
+from pathlib import Path
+from typing import Optional
+
+from data_tools.utilities.alter_table import get_location_data
+from reports.config import get_logger, set_instrumentation
 from reports.models import (
     summary_production_model,
     location_consumption_model,
     location_production_model,
 )
 from reports.email import email_recips, email_utils
+from reports.settings import (
+    FETCH_TIMEOUT,
+    FETCH_WORKERS,
+    LOCATION_TIMEOUT,
+    METRICS_ROOT,
+    PAGE_CACHE_ROOT,
+    RUNS_ROOT,
+    STORE_ROOT,
+)
+from reports.templates.page_cache import PageCache
+from reports.templates.render import drain, render_pdf
+from reports.utilities.checkpoints import RunFolder
+from reports.utilities.day_cube import DayCube
+from reports.utilities.derived import DerivedColumns
+from reports.utilities.instrumentation import span
+from reports.utilities.isolation import DegradedLocations, run_deadline
 from reports.utilities.log_helper import log_call
+from reports.utilities.minute_store import MinuteStore
+from reports.utilities.profiling import StageProfiler
 
 logger = get_logger(__name__)
 
+# Subject and attachment name of the report for each recipient list.
+EDITIONS = {
+    "all": (
+        "Location & Unit Operation Report - {:%B %d}",
+        "Location & Unit Summary {:%m-%d-%Y}.pdf",
+    ),
+    "supervisors": (
+        "Production Summary - {:%B %d}",
+        "Production Summary {:%m-%d-%Y}.pdf",
+    ),
+}
+
+
+# The summary model first, then the per-location models.
+MODELS = (
+    summary_production_model,
+    location_consumption_model,
+    location_production_model,
+)
+
+
+def fetch_plans(models=MODELS):
+    """Historian requests of ``models`` over their report windows."""
+    requests = []
+    for model in models:
+        requests.extend(model.fetch_plan(*model.report_window()))
+    return requests
+
 
 @log_call(logger=logger)
-def generate_master():
+def generate_master(
+    max_workers: int = FETCH_WORKERS,
+    timeout: float = FETCH_TIMEOUT,
+    render_processes: Optional[int] = None,
+    minute_store: Optional[Path] = STORE_ROOT,
+    metrics_dir: Optional[Path] = METRICS_ROOT,
+    profiler: Optional[StageProfiler] = None,
+    fetch=get_location_data,
+    fast_render: bool = False,
+    page_cache: Optional[Path] = PAGE_CACHE_ROOT,
+    run_dir: Path = RUNS_ROOT,
+    resume: bool = False,
+    location_timeout: Optional[float] = LOCATION_TIMEOUT,
+    summary_first: bool = False,
+    deadline: Optional[dt.time] = None,
+):
     end_date = dt.datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
     start_date = end_date - dt.timedelta(days=1)
 
-    product_summary_figure = summary_production_model.operation()
-
-    (
-        location_consumable_figures,
-        location_measured_figures,
-    ) = location_consumption_model.operation()
-
-    (
-        location_product_figures,
-        location_inlet_figures,
-    ) = location_production_model.operation()
-
-    logger.info("\nStarting add all figures to Master Report")
-    all_figs = (
-        product_summary_figure
-        + location_product_figures
-        + location_inlet_figures
-        + location_consumable_figures
-        + location_measured_figures
+    run = RunFolder(
+        run_dir, f"master_report_{start_date.strftime('%Y-%m-%d')}", resume=resume
     )
+
+    instrumentation = set_instrumentation(name="master_report")
+    if profiler is not None:
+        instrumentation.listeners.append(profiler)
+    try:
+        run_master(
+            start_date,
+            end_date,
+            max_workers,
+            timeout,
+            render_processes,
+            minute_store,
+            fetch,
+            fast_render,
+            page_cache,
+            run,
+            location_timeout,
+            summary_first,
+            deadline and dt.datetime.combine(end_date.date(), deadline),
+        )
+    finally:
+        instrumentation.finish()
+        logger.info("Master Report stages:\n%s", instrumentation.table())
+        if metrics_dir is not None:
+            instrumentation.write(
+                metrics_dir, f"master_report_{start_date.strftime('%Y-%m-%d')}"
+            )
+        set_instrumentation(False)
+
+
+def fetch_stage(
+    run: RunFolder, fetch, max_workers: int, timeout: float, models=MODELS
+) -> DayCube:
+    """The day cube of ``models``, read back from ``run`` if it was already fetched."""
+    if run.done("fetch"):
+        return DayCube.load(run.path("cube"), fetch)
+    # Every summed tag of the run is fetched once per location into one array;
+    # the models read their frames from it.
+    with span("fetch") as fetch_span:
+        cube = DayCube.build(fetch_plans(models), fetch, max_workers, timeout)
+        fetch_span.add_rows(cube.valid.any(axis=1).sum())
+    cube.save(run.path("cube"))
+    run.complete("fetch")
+    return cube
+
+
+def model_stage(
+    run: RunFolder,
+    cube: DayCube,
+    max_workers: int,
+    timeout: float,
+    degraded: DegradedLocations,
+    derived: Optional[DerivedColumns] = None,
+    detail: bool = True,
+    summary_figure=None,
+    deadline: Optional[dt.datetime] = None,
+):
+    """Run the models and save the figure groups of ``run``'s edition.
+
+    The summary page comes from ``summary_figure`` if it was already made.
+    Without ``detail`` only the summary page is made; otherwise the
+    per-location models follow, each location being cut off at ``deadline``.
+    """
+    # Cumulative product columns are shared by the summary and production models.
+    derived = derived or DerivedColumns()
+
+    if summary_figure is None:
+        with span("summary_production_model"):
+            summary_figure = summary_production_model.operation(
+                cube.get_location_data,
+                max_workers,
+                timeout,
+                derived=derived,
+                degraded=degraded,
+            )
+    figure_groups = [summary_figure]
+
+    if detail:
+        degraded.deadline = deadline
+        with span("location_consumption_model"):
+            (
+                location_consumable_figures,
+                location_measured_figures,
+            ) = location_consumption_model.operation(
+                cube.get_location_data, max_workers, timeout, degraded=degraded
+            )
+
+        with span("location_production_model"):
+            (
+                location_product_figures,
+                location_inlet_figures,
+            ) = location_production_model.operation(
+                cube.get_location_data,
+                max_workers,
+                timeout,
+                derived=derived,
+                degraded=degraded,
+            )
+        figure_groups.extend(
+            [
+                location_product_figures,
+                location_inlet_figures,
+                location_consumable_figures,
+                location_measured_figures,
+            ]
+        )
+    cube.report()
+    derived.report()
+    degraded.report()
+
     logger.info("Add all figures to Master Report complete\n")
-    if not all_figs:
+    if not any(figure_groups):
         raise Exception("All figures failed\n")
+    run.save("figures.pickle", figure_groups)
+    run.save("degraded.pickle", degraded)
+    run.complete("model")
+    return figure_groups
 
-    logger.info("\nCreating email for Master Report")
-    email = email_utils.EmailMsg(
-        email_recips.get_recipiant_list("all"),
-        f"Location & Unit Operation Report - {start_date.strftime('%B %d')}",
-    )
-    email.convert_plots_to_attachment(
-        f"Location & Unit Summary {start_date.strftime('%m-%d-%Y')}.pdf", all_figs,
+
+def render_stage(
+    run: RunFolder,
+    figure_groups,
+    render_processes: Optional[int],
+    fast_render: bool,
+    page_cache: Optional[Path],
+):
+    # A rerun only renders the pages whose template call changed.
+    cache = PageCache(page_cache) if page_cache is not None else None
+    # Pages are built, written and released one at a time.
+    with span("render"):
+        render_pdf(
+            run.path("report.pdf"),
+            drain(*figure_groups),
+            render_processes,
+            fast=fast_render,
+            cache=cache,
+        )
+    if cache is not None:
+        cache.report()
+    run.complete("render")
+
+
+def master_email(start_date: dt.datetime, recipients: str = "all"):
+    subject, _ = EDITIONS[recipients]
+    return email_utils.EmailMsg(
+        email_recips.get_recipiant_list(recipients), subject.format(start_date)
     )
 
-    email.send()
-    logger.info("Email for Master Report prepared to send\n")
+
+def assemble_stage(run: RunFolder, start_date: dt.datetime, recipients: str = "all"):
+    logger.info("\nCreating email for Master Report")
+    email = master_email(start_date, recipients)
+    degraded = run.load("degraded.pickle")
+    if degraded:
+        email.add_text(degraded.summary())
+    _, attachment = EDITIONS[recipients]
+    with span("attach"):
+        email.attach_file(attachment.format(start_date), run.path("report.pdf"), "pdf")
+    with span("mime"):
+        run.path("message.eml").write_text(email.construct_msg().as_string())
+    run.complete("assemble")
+
+
+def send_stage(run: RunFolder, start_date: dt.datetime, recipients: str = "all"):
+    master_email(start_date, recipients).deliver(run.path("message.eml").read_text())
+    run.complete("send")
+    logger.info("Email for Master Report prepared to send to %s\n", recipients)
+
+
+def deliver_edition(
+    run: RunFolder,
+    start_date: dt.datetime,
+    recipients: str,
+    figure_groups,
+    render_processes: Optional[int],
+    fast_render: bool,
+    page_cache: Optional[Path],
+):
+    """Render, assemble and send the edition modelled in ``run``."""
+    if not run.done("render"):
+        if figure_groups is None:
+            figure_groups = run.load("figures.pickle")
+        render_stage(run, figure_groups, render_processes, fast_render, page_cache)
+    if not run.done("assemble"):
+        assemble_stage(run, start_date, recipients)
+    if not run.done("send"):
+        send_stage(run, start_date, recipients)
+
+
+def run_master(
+    start_date: dt.datetime,
+    end_date: dt.datetime,
+    max_workers: int,
+    timeout: float,
+    render_processes: Optional[int],
+    minute_store: Optional[Path],
+    fetch=get_location_data,
+    fast_render: bool = False,
+    page_cache: Optional[Path] = None,
+    run: Optional[RunFolder] = None,
+    location_timeout: Optional[float] = LOCATION_TIMEOUT,
+    summary_first: bool = False,
+    deadline: Optional[dt.datetime] = None,
+):
+    """Fetch, model, render, assemble and send the report.
+
+    Each stage leaves its artifacts in ``run`` and marks itself done there; the
+    stages ``run`` already has done are skipped. Run folders beside ``run``
+    older than ``RUNS_KEEP_DAYS`` are deleted first. Each location gets
+    ``location_timeout`` seconds in each model; one that fails or runs over gets
+    "No Data" pages and is listed in the email. Per-location work still left at
+    ``deadline`` gets "No Data" pages too, so the report goes out on time; a
+    deadline already past when the run starts only leaves ``location_timeout``.
+
+    With ``summary_first`` only the summary model's data is fetched before the
+    summary pages go to the supervisors, from the ``summary`` folder of
+    ``run``; the per-location data is fetched after that, and the full report
+    follows once the per-location pages are done.
+    """
+    if run is None:
+        run = RunFolder(RUNS_ROOT, f"master_report_{start_date.strftime('%Y-%m-%d')}")
+    run.prune()
+    if run.next_stage() is None:
+        logger.info("Master Report in %s was already sent", run.dir)
+        return
+    deadline = run_deadline(deadline, location_timeout)
+
+    if minute_store is not None:
+        fetch = MinuteStore(minute_store, fetch).get_location_data
+    degraded = DegradedLocations(location_timeout)
+    derived = summary_figure = figure_groups = None
+
+    if summary_first:
+        edition = RunFolder(run.dir, "summary", resume=True)
+        summary_groups = None
+        if not edition.done("model"):
+            cube = fetch_stage(
+                edition, fetch, max_workers, timeout, (summary_production_model,)
+            )
+            derived = DerivedColumns()
+            summary_groups = model_stage(
+                edition, cube, max_workers, timeout, degraded, derived, detail=False
+            )
+        deliver_edition(
+            edition,
+            start_date,
+            "supervisors",
+            summary_groups,
+            render_processes,
+            fast_render,
+            page_cache,
+        )
+        # Rendering drained the summary pages, the full report reads them back.
+        (summary_figure,) = edition.load("figures.pickle")
+        degraded = edition.load("degraded.pickle")
+
+    if not run.done("model"):
+        models = MODELS if summary_figure is None else MODELS[1:]
+        cube = fetch_stage(run, fetch, max_workers, timeout, models)
+        figure_groups = model_stage(
+            run,
+            cube,
+            max_workers,
+            timeout,
+            degraded,
+            derived,
+            summary_figure=summary_figure,
+            deadline=deadline,
+        )
+    deliver_edition(
+        run,
+        start_date,
+        "all",
+        figure_groups,
+        render_processes,
+        fast_render,
+        page_cache,
+    )
 
 
 if __name__ == "__main__":
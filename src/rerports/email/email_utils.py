@@ -11,8 +11,10 @@ from email.mime.text import MIMEText
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
-from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
 from reports.config import get_logger
+from reports.templates.render import FigureSpec, render_pdf
+from reports.utilities.instrumentation import span
 from reports.utilities.log_helper import log_call
 
 logger = get_logger(__name__)
@@ -40,10 +42,15 @@ class EmailMsg:
 
     @log_call(logger=logger)
     def send(self):
-        msg = self.construct_msg()
-        with smtplib.SMTP("smtp.company.com") as mailer:
+        with span("mime"):
+            message = self.construct_msg().as_string()
+        self.deliver(message)
+
+    def deliver(self, message: str):
+        """Send an already constructed ``message`` to the recipient list."""
+        with span("smtp"), smtplib.SMTP("smtp.company.com") as mailer:
             server_response = smtplib.SMTP.ehlo(mailer)
-            mailer.sendmail(msg["From"], self.recipient_list, msg.as_string())
+            mailer.sendmail(self.sender, self.recipient_list, message)
 
     def construct_msg(self):
         msg = MIMEMultipart()
@@ -59,16 +66,18 @@ class EmailMsg:
         return msg
 
     @log_call(logger=logger)
-    def convert_plots_to_attachment(self, figure_name, figures):
-        if not isinstance(figures, (list, tuple)):
+    def convert_plots_to_attachment(
+        self, figure_name, figures, processes=None, fast=False, cache=None
+    ):
+        if isinstance(figures, (Figure, FigureSpec)):
             figures = [figures]
         with TemporaryDirectory() as temp_dir:
             dir_path = Path(str(temp_dir))
             file = dir_path / "plots.pdf"
-            with PdfPages(file) as pdf_file:
-                for figure in figures:
-                    pdf_file.savefig(figure, dpi=300, bbox_inches="tight")
-            self.attach_file(figure_name, file, "pdf")
+            with span("render"):
+                render_pdf(file, figures, processes, fast=fast, cache=cache)
+            with span("attach"):
+                self.attach_file(figure_name, file, "pdf")
 
     def attach_file(self, attachment_name, file, file_type):
         with file.open("rb") as f:
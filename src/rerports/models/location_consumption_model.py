@@ -4,33 +4,46 @@ import datetime as dt
 from collections import defaultdict
 
 import numexpr as ne
+import numpy as np
 
 from data_tools.algorithms.fill_and_drain_inference import (
     calculate_chemical_usage,
     infer_fill_and_drain,
 )
-from reports.templates.daily_plots import consum_measured_analysis, consum_plot
-from data_tools.utilities.tags import TAGS, GetTags
+from reports.config import get_logger
+from reports.templates.figure_spec import FigureSpec
 from data_tools.utilities.alter_table import (
     calculate_cumulative_flows,
     get_location_data,
 )
 from data_tools.utilities.build_table import convert_to_zero, extend_list
+from reports.utilities.shifts import boundary_table, shift_windows
+from reports.settings import FETCH_TIMEOUT, FETCH_WORKERS
+from reports.utilities.fetch_pool import FetchRequest, fetch_request, prefetch
+from reports.utilities.instrumentation import span
+from reports.utilities.isolation import DegradedLocations, plan_requests
+from reports.utilities.log_helper import log_call
+from reports.utilities.registry import field, get_registry
+
+logger = get_logger(__name__)
 
 ne.set_num_threads(12)
 
-CONNECTION_TYPE = GetTags().connection_type
-DESIGNATION = GetTags().designation
-INLET_FLOWRATE = GetTags().inlet_flowrate
-FUEL = GetTags().fuel
-FUEL_FLOWRATE = GetTags().fuel_flowrate
-TRUCKED = GetTags().trucked
-CHEMICAL_A = GetTags().chemical_a
-CHEMICAL_A_VOLUME = GetTags().chemical_a_volume
+CONNECTION_TYPE = field("connection_type")
+DESIGNATION = field("designation")
+INLET_FLOWRATE = field("inlet_flowrate")
+FUEL = field("fuel")
+FUEL_FLOWRATE = field("fuel_flowrate")
+TRUCKED = field("trucked")
+CHEMICAL_A = field("chemical_a")
+CHEMICAL_A_VOLUME = field("chemical_a_volume")
+
+# Tank level data either side of a shift used to infer fills and drains.
+SHIFT_PADDING = dt.timedelta(hours=1)
 
 
-def flowrate_based_values(location, start_date: dt, end_date: dt):
-    chem_data = get_location_data(
+def flowrate_request(location, start_date: dt, end_date: dt):
+    return FetchRequest(
         location,
         [INLET_FLOWRATE(location), FUEL_FLOWRATE(location)],
         ["inlet_flowrate", "fuel_vol"],
@@ -38,22 +51,10 @@ def flowrate_based_values(location, start_date: dt, end_date: dt):
         end_date,
         TRUCKED(location),
     )
-    chem_data["cumulative_inlet"] = calculate_cumulative_flows(
-        chem_data.inlet_flowrate, 1 / 1440
-    )
-    chem_data["cumulative_fuel"] = calculate_cumulative_flows(
-        chem_data.fuel_vol, 1 / 1440
-    )
-    shift_1_values = chem_data.loc[chem_data.index.strftime("%H:%M:%S") == "19:00:00"]
-
-    shift_2_values = chem_data.loc[chem_data.index.strftime("%H:%M:%S") == "07:00:00"]
-    shift_2_values = shift_2_values.drop(shift_2_values.index[0])
 
-    return shift_1_values, shift_2_values
 
-
-def level_based_values(location, start_date: dt, end_date: dt):
-    chem_data = get_location_data(
+def level_request(location, start_date: dt, end_date: dt):
+    return FetchRequest(
         location,
         [INLET_FLOWRATE(location), CHEMICAL_A_VOLUME(location)],
         ["inlet_flowrate", "chemical_a_vol"],
@@ -61,196 +62,235 @@ def level_based_values(location, start_date: dt, end_date: dt):
         end_date,
         TRUCKED(location),
     )
+
+
+def report_window():
+    end_date = dt.datetime.today().replace(hour=8, minute=0, second=0, microsecond=0)
+    return end_date - dt.timedelta(hours=26), end_date
+
+
+def fetch_plan(start_date: dt, end_date: dt):
+    registry = get_registry()
+    requests = plan_requests(level_request, registry.consumption, start_date, end_date)
+    requests.extend(plan_requests(flowrate_request, registry, start_date, end_date))
+    return requests
+
+
+def flowrate_data(location, start_date: dt, end_date: dt, fetch=get_location_data):
+    chem_data = fetch_request(fetch, flowrate_request(location, start_date, end_date))
     chem_data["cumulative_inlet"] = calculate_cumulative_flows(
         chem_data.inlet_flowrate, 1 / 1440
     )
-    shift_1_start = start_date.replace(hour=7, minute=0, second=0)
-    shift_1_end = shift_1_start + dt.timedelta(hours=12)
-    shift_2_end = shift_1_end + dt.timedelta(hours=12)
-    one_hour = dt.timedelta(hours=1)
-
-    shift_1_level_data_slice = slice(start_date, shift_1_end + one_hour)
-    shift_2_level_data_slice = slice(shift_1_end - one_hour, shift_2_end + one_hour)
-    shift_1 = chem_data.loc[shift_1_level_data_slice]
-    if shift_1.empty:
-        shift_1_chemical_a, shift_1_inlet = 0, 0
-    else:
-        valid_fwd_values, valid_bkwd_values, shift_1_inlet = infer_fill_and_drain(
-            shift_1, shift_1_start, shift_1_end
-        )
-        shift_1_chemical_a = calculate_chemical_usage(
-            valid_fwd_values, valid_bkwd_values
-        )
+    chem_data["cumulative_fuel"] = calculate_cumulative_flows(
+        chem_data.fuel_vol, 1 / 1440
+    )
+    return chem_data
 
-    shift_2 = chem_data.loc[shift_2_level_data_slice]
-    if shift_2.empty:
-        shift_2_chemical_a, shift_2_inlet = 0, 0
-    else:
-        valid_fwd_values, valid_bkwd_values, shift_2_inlet = infer_fill_and_drain(
-            shift_2, shift_1_end, shift_2_end,
-        )
-        shift_2_chemical_a = calculate_chemical_usage(
-            valid_fwd_values, valid_bkwd_values
-        )
+
+@log_call(logger=logger, timing=True)
+def level_based_values(location, start_date: dt, end_date: dt, fetch=get_location_data):
+    chem_data = fetch_request(fetch, level_request(location, start_date, end_date))
+    chem_data["cumulative_inlet"] = calculate_cumulative_flows(
+        chem_data.inlet_flowrate, 1 / 1440
+    )
+    chemical_a, inlet = [], []
+    for window in shift_windows(start_date):
+        shift = chem_data.loc[window.start - SHIFT_PADDING : window.end + SHIFT_PADDING]
+        if shift.empty:
+            chemical_a.append(0)
+            inlet.append(0)
+        else:
+            with span("infer_fill_and_drain") as infer_span:
+                valid_fwd_values, valid_bkwd_values, shift_inlet = infer_fill_and_drain(
+                    shift, window.start, window.end
+                )
+                infer_span.add_rows(len(shift))
+            chemical_a.append(
+                calculate_chemical_usage(valid_fwd_values, valid_bkwd_values)
+            )
+            inlet.append(shift_inlet)
+    shift_1_chemical_a, shift_2_chemical_a = chemical_a
+    shift_1_inlet, shift_2_inlet = inlet
 
     return shift_1_chemical_a, shift_2_chemical_a, shift_1_inlet, shift_2_inlet
 
 
 def per_inlet_volume(
-    shift_1_values,
-    shift_2_values,
-    chem_usage,
-    shift_1_inlet=None,
-    shift_2_inlet=None,
-    column=None,
+    shift_1_values, shift_2_values, chem_usage, shift_1_inlet, shift_2_inlet
 ):
-    if chem_usage == "level_based":
-        if shift_1_inlet == 0 and shift_2_inlet == 0:
-            shift_1_per_inlet_volume = 0
-            shift_2_per_inlet_volume = 0
-        elif shift_1_inlet == 0 and shift_2_inlet != 0:
-            shift_1_per_inlet_volume = 0
-            shift_2_per_inlet_volume = shift_2_values / (shift_2_inlet / 1000)
-        elif shift_1_inlet != 0 and shift_2_inlet == 0:
-            shift_1_per_inlet_volume = shift_1_values / (shift_1_inlet / 1000)
-            shift_2_per_inlet_volume = 0
-        else:
-            shift_1_per_inlet_volume = shift_1_values / (shift_1_inlet / 1000)
-            shift_2_per_inlet_volume = shift_2_values / (shift_2_inlet / 1000)
-    else:
-        if shift_1_values.empty and shift_2_values.empty:
-            shift_1_per_inlet_volume = 0
-            shift_2_per_inlet_volume = 0
-        elif shift_1_values.empty and shift_2_values.empty == False:
-            shift_1_per_inlet_volume = 0
-            shift_2_per_inlet_volume = (
-                (shift_2_values[column].iloc[0] - shift_1_values[column].iloc[0]) * 1000
-            ) / (
-                shift_2_values.cumulative_inlet.iloc[0]
-                - shift_1_values.cumulative_inlet.iloc[0]
+    """Per-inlet volume of both shifts for every location in one pass.
+
+    ``level_based`` takes the volume used and inlet volume of each shift.
+    ``flow_based`` takes the cumulative volume and cumulative inlet at each
+    shift end, with ``NaN`` where a location has no row for that shift. A shift
+    that cannot be calculated (no inlet, or a missing shift) is 0.
+    """
+    shift_1_values, shift_2_values, shift_1_inlet, shift_2_inlet = (
+        np.asarray(values, dtype=float)
+        for values in (shift_1_values, shift_2_values, shift_1_inlet, shift_2_inlet)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if chem_usage == "level_based":
+            shift_1_per_inlet_volume = np.where(
+                shift_1_inlet != 0, shift_1_values / (shift_1_inlet / 1000), 0
             )
-        elif shift_1_values.empty == False and shift_2_values.empty:
-            shift_1_per_inlet_volume = (
-                shift_1_values[column].iloc[0] * 1000
-            ) / shift_1_values.cumulative_inlet.iloc[0]
-            shift_2_per_inlet_volume = 0
-        elif (
-            shift_2_values.cumulative_inlet.iloc[0]
-            - shift_1_values.cumulative_inlet.iloc[0]
-            != 0
-        ):
-            shift_1_per_inlet_volume = (
-                shift_1_values[column].iloc[0] * 1000
-            ) / shift_1_values.cumulative_inlet.iloc[0]
-
-            shift_2_per_inlet_volume = (
-                (shift_2_values[column].iloc[0] - shift_1_values[column].iloc[0]) * 1000
-            ) / (
-                shift_2_values.cumulative_inlet.iloc[0]
-                - shift_1_values.cumulative_inlet.iloc[0]
+            shift_2_per_inlet_volume = np.where(
+                shift_2_inlet != 0, shift_2_values / (shift_2_inlet / 1000), 0
             )
         else:
-            shift_1_per_inlet_volume = 0
-            shift_2_per_inlet_volume = 0
+            has_shift_1 = ~np.isnan(shift_1_values)
+            has_shift_2 = ~np.isnan(shift_2_values)
+            shift_2_inlet = shift_2_inlet - shift_1_inlet
+            both_usable = has_shift_1 & has_shift_2 & (shift_2_inlet != 0)
+
+            shift_1_per_inlet_volume = np.where(
+                has_shift_1 & (~has_shift_2 | both_usable),
+                shift_1_values * 1000 / shift_1_inlet,
+                0,
+            )
+            shift_2_per_inlet_volume = np.where(
+                both_usable,
+                (shift_2_values - shift_1_values) * 1000 / shift_2_inlet,
+                0,
+            )
 
     return shift_1_per_inlet_volume, shift_2_per_inlet_volume
 
 
-def operation():
-    end_date = dt.datetime.today().replace(hour=8, minute=0, second=0, microsecond=0)
-    start_date = end_date - dt.timedelta(hours=26)
-
-    location_chemical_a_data = defaultdict(dict)
-    location_fuel_data = defaultdict(dict)
-    location_type_b_tank_level = defaultdict(dict)
-
-    chemical_a_shift_1_values = []
-    chemical_a_shift_2_values = []
-    fuel_shift_1_values = []
-    fuel_shift_2_values = []
-    location_names = []
-
-    for location, _ in TAGS:
-        if location != "Location_I" and CONNECTION_TYPE(location) != "connection_1":
-            (
-                shift_1_chemical_a,
-                shift_2_chemical_a,
-                shift_1_inlet,
-                shift_2_inlet,
-            ) = level_based_values(location, start_date, end_date,)
-
-            shift_1_chemical_a_eff, shift_2_chemical_a_eff = per_inlet_volume(
-                shift_1_chemical_a,
-                shift_2_chemical_a,
-                "level_based",
-                shift_1_inlet,
-                shift_2_inlet,
-            )
-            chemical_a_shift_1_values.append(shift_1_chemical_a_eff)
-            chemical_a_shift_2_values.append(shift_2_chemical_a_eff)
-
-            data = get_location_data(
-                location,
-                [INLET_FLOWRATE(location), CHEMICAL_A_VOLUME(location)],
-                ["inlet_flowrate", "chemical_a_vol"],
-                start_date,
-                end_date,
-                TRUCKED(location),
-            )
+def location_values(
+    location, consumption: bool, start_date: dt, end_date: dt, fetch=get_location_data
+):
+    """Shift values and measured tank figure (None unless ``consumption``) and
+    cumulative fuel and inlet of ``location``."""
+    shift_values = measured_figure = None
+    if consumption:
+        windows = shift_windows(start_date)
+        day_start, day_end = windows[0].start, windows[-1].end
+        shift_values = level_based_values(location, start_date, end_date, fetch)
+
+        data = fetch_request(fetch, level_request(location, start_date, end_date))
+        with span("infer_fill_and_drain") as infer_span:
             valid_fwd_values, valid_bkwd_values, _ = infer_fill_and_drain(
-                data, start_date.replace(hour=7), end_date.replace(hour=7),
+                data, day_start, day_end
             )
-            vol_used = calculate_chemical_usage(valid_fwd_values, valid_bkwd_values)
+            infer_span.add_rows(len(data))
+        vol_used = calculate_chemical_usage(valid_fwd_values, valid_bkwd_values)
 
+        measured_figure = FigureSpec(
+            "consum_measured_analysis",
             (
-                location_type_b_tank_level[location]["measured_figures"],
-                location_type_b_tank_level[location]["summary_figures"],
-            ) = consum_measured_analysis(
-                start_date.replace(hour=7),
-                end_date.replace(hour=7),
+                day_start,
+                day_end,
                 location,
                 data,
                 valid_fwd_values,
                 valid_bkwd_values,
                 vol_used,
+            ),
+        )
+
+    fuel = flowrate_data(location, start_date, end_date, fetch)[
+        ["cumulative_fuel", "cumulative_inlet"]
+    ]
+    return shift_values, measured_figure, fuel
+
+
+def operation(
+    fetch=get_location_data,
+    max_workers: int = FETCH_WORKERS,
+    timeout: float = FETCH_TIMEOUT,
+    degraded: DegradedLocations = None,
+):
+    start_date, end_date = report_window()
+
+    fetch = prefetch(
+        fetch_plan(start_date, end_date), fetch, max_workers, timeout
+    ).get_location_data
+    degraded = degraded if degraded is not None else DegradedLocations()
+
+    location_chemical_a_data = defaultdict(dict)
+    location_fuel_data = defaultdict(dict)
+
+    chemical_a_shift_values = []
+    daily_measured_figures = []
+    fuel_data = {}
+
+    registry = get_registry()
+    consumption = frozenset(registry.consumption)
+    for location in registry:
+        with span(str(location)):
+            values = degraded.run(
+                "location_consumption_model",
+                location,
+                location_values,
+                location,
+                location in consumption,
+                start_date,
+                end_date,
+                fetch,
             )
-            daily_measured_figures = [
-                location_type_b_tank_level[location_type_b]["measured_figures"]
-                for location_type_b in location_type_b_tank_level
-            ]
+        if values is None:
+            # A location that fails is left out of the usage charts.
+            if location in consumption:
+                daily_measured_figures.append(
+                    degraded.placeholder(location, "Chemical A Tank Volume Analysis")
+                )
+            continue
+        shift_values, measured_figure, fuel_data[location] = values
+        if location in consumption:
+            chemical_a_shift_values.append(shift_values)
+            daily_measured_figures.append(measured_figure)
+    if not fuel_data:
+        # Every location failed, so there is no usage to chart.
+        daily_consum_figures = [
+            FigureSpec("no_data_plot", (f"Daily {name.upper()} Usage Summary",))
+            for name in ("chemical_a", "fuel")
+        ]
+        return daily_consum_figures, daily_measured_figures
+    location_names = list(fuel_data)
+
+    level_values = np.array(chemical_a_shift_values, dtype=float).reshape(-1, 4)
+    chemical_a_shift_1_values, chemical_a_shift_2_values = per_inlet_volume(
+        level_values[:, 0],
+        level_values[:, 1],
+        "level_based",
+        level_values[:, 2],
+        level_values[:, 3],
+    )
 
-        shift_1_fuel, shift_2_fuel = flowrate_based_values(
-            location, start_date, end_date,
-        )
-        shift_1_fuel_avg, shift_2_fuel_avg = per_inlet_volume(
-            shift_1_fuel, shift_2_fuel, "flow_based", column="cumulative_fuel"
-        )
-        fuel_shift_1_values.append(shift_1_fuel_avg)
-        fuel_shift_2_values.append(shift_2_fuel_avg)
-        location_names.append(location)
+    fuel_boundaries = boundary_table(fuel_data, start_date)
+    shift_1_fuel = fuel_boundaries.xs("shift_1", level="shift")
+    shift_2_fuel = fuel_boundaries.xs("shift_2", level="shift")
+    fuel_shift_1_values, fuel_shift_2_values = per_inlet_volume(
+        shift_1_fuel.cumulative_fuel,
+        shift_2_fuel.cumulative_fuel,
+        "flow_based",
+        shift_1_fuel.cumulative_inlet,
+        shift_2_fuel.cumulative_inlet,
+    )
 
-    chemical_a_shift_1_values = extend_list(chemical_a_shift_1_values)
-    chemical_a_shift_2_values = extend_list(chemical_a_shift_2_values)
+    chemical_a_shift_1_values = extend_list(chemical_a_shift_1_values.tolist())
+    chemical_a_shift_2_values = extend_list(chemical_a_shift_2_values.tolist())
 
     chemical_a_shift_1_values = convert_to_zero(chemical_a_shift_1_values)
     chemical_a_shift_2_values = convert_to_zero(chemical_a_shift_2_values)
 
-    fuel_shift_1_values = convert_to_zero(fuel_shift_1_values)
-    fuel_shift_2_values = convert_to_zero(fuel_shift_2_values)
-    (
-        location_chemical_a_data["consum_figures"],
-        location_chemical_a_data["summary_figures"],
-    ) = consum_plot(
-        chemical_a_shift_1_values,
-        chemical_a_shift_2_values,
-        location_names,
-        "chemical_a",
+    fuel_shift_1_values = convert_to_zero(fuel_shift_1_values.tolist())
+    fuel_shift_2_values = convert_to_zero(fuel_shift_2_values.tolist())
+    location_chemical_a_data["consum_figures"] = FigureSpec(
+        "consum_plot",
+        (
+            chemical_a_shift_1_values,
+            chemical_a_shift_2_values,
+            location_names,
+            "chemical_a",
+        ),
     )
 
-    (
-        location_fuel_data["consum_figures"],
-        location_fuel_data["summary_figures"],
-    ) = consum_plot(fuel_shift_1_values, fuel_shift_2_values, location_names, "fuel",)
+    location_fuel_data["consum_figures"] = FigureSpec(
+        "consum_plot",
+        (fuel_shift_1_values, fuel_shift_2_values, location_names, "fuel"),
+    )
 
     daily_consum_figures = [
         location_chemical_a_data["consum_figures"],
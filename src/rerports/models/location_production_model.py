@@ -2,8 +2,6 @@
 import datetime as dt
 import pandas as pd
 
-from collections import defaultdict
-
 import numexpr as ne
 
 from reports.models.summary_production_model import (
@@ -12,14 +10,19 @@ from reports.models.summary_production_model import (
     CONNECTION_TYPE,
     INLET_FLOWRATE,
 )
-from reports.templates.daily_plots import product_plot, inlet_plot
-from data_tools.utilities.tags import TAGS, GetTags
-from data_tools.utilities.alter_table import (
-    product_calculations,
-    calculate_cumulative_flows,
-    calculate_cumulative_tank_volumes,
-    get_location_data,
+from reports.templates.figure_spec import FigureSpec
+from data_tools.utilities.alter_table import get_location_data
+from reports.utilities.derived import (
+    PRODUCT,
+    DerivedColumns,
+    cumulative_flow,
+    cumulative_tank,
 )
+from reports.utilities.instrumentation import span
+from reports.utilities.isolation import DegradedLocations, plan_requests
+from reports.utilities.registry import field, get_registry
+from reports.settings import FETCH_TIMEOUT, FETCH_WORKERS
+from reports.utilities.fetch_pool import FetchRequest, fetch_request, prefetch
 from data_tools.utilities.summary_table import (
     calculate_product_summary_stats,
     calculate_flow_summary_stats,
@@ -28,101 +31,130 @@ from data_tools.utilities.summary_table import (
 
 ne.set_num_threads(12)
 
-NAME = GetTags().name
-CONNECTION_TYPE = GetTags().connection_type
-INLET_FLOWRATE = GetTags().inlet_flowrate
-PIPELINE_PRESSURE = GetTags().pipeline_pressure
-INLET_NAMES = GetTags().inlet_names
-FUEL_FLOWRATE = GetTags().fuel_flowrate
-DISCHARGE_FLOWRATE = GetTags().discharge_flowrate
-PRODUCT_TANK_VOLUME = GetTags().product_tank_volume
-TRUCKED = GetTags().trucked
-PRODUCT_FLOWRATE = GetTags().product_flowrate
+NAME = field("name")
+CONNECTION_TYPE = field("connection_type")
+INLET_FLOWRATE = field("inlet_flowrate")
+PIPELINE_PRESSURE = field("pipeline_pressure")
+INLET_NAMES = field("inlet_names")
+FUEL_FLOWRATE = field("fuel_flowrate")
+DISCHARGE_FLOWRATE = field("discharge_flowrate")
+PRODUCT_TANK_VOLUME = field("product_tank_volume")
+TRUCKED = field("trucked")
+PRODUCT_FLOWRATE = field("product_flowrate")
+
+
+def product_request(location, start_date: dt, end_date: dt):
+    return FetchRequest(
+        location,
+        [
+            INLET_FLOWRATE(location),
+            PRODUCT_FLOWRATE(location),
+            PRODUCT_TANK_VOLUME(location),
+        ],
+        ["inlet_flowrate", "product_flowrate", "product_tank_volume"],
+        start_date,
+        end_date,
+        TRUCKED(location),
+    )
+
+
+def flow_request(location, start_date: dt, end_date: dt):
+    if (
+        INLET_FLOWRATE(location)
+        and DISCHARGE_FLOWRATE(location)
+        and FUEL_FLOWRATE(location)
+    ):
+        tags = [
+            INLET_FLOWRATE(location),
+            FUEL_FLOWRATE(location),
+            DISCHARGE_FLOWRATE(location),
+        ]
+        cols = ["inlet_flowrate", "fuel_flowrate", "discharge_flowrate"]
+    elif not INLET_FLOWRATE(location):
+        tags = [FUEL_FLOWRATE(location), DISCHARGE_FLOWRATE(location)]
+        cols = ["fuel_flowrate", "discharge_flowrate"]
+    elif not DISCHARGE_FLOWRATE(location):
+        tags = [INLET_FLOWRATE(location), FUEL_FLOWRATE(location)]
+        cols = ["inlet_flowrate", "fuel_flowrate"]
+    else:
+        raise KeyError(f"{location} has no fuel flowrate tag")
+    return FetchRequest(location, tags, cols, start_date, end_date, TRUCKED(location))
 
 
-def operation():
+def pressure_request(location, start_date: dt, end_date: dt):
+    return FetchRequest(
+        location,
+        [PIPELINE_PRESSURE(location)],
+        [INLET_NAMES(location)],
+        start_date,
+        end_date,
+        TRUCKED(location),
+        sum_values=False,
+    )
+
+
+PRODUCT_DERIVATIONS = [
+    cumulative_flow("cumulative_inlet", "inlet_flowrate", 1 / 1440),
+    PRODUCT,
+    cumulative_flow("cum_liquid_product_flowrate", "product_flowrate", 1),
+    cumulative_tank("cum_tank", "product_tank_volume"),
+]
+
+
+def report_window():
     end_date = dt.datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
-    start_date = end_date - dt.timedelta(days=1)
+    return end_date - dt.timedelta(days=1), end_date
 
-    location_product_data = defaultdict(dict)
-    location_inlet_data = defaultdict(dict)
-    for location, _ in TAGS:
-        if CONNECTION_TYPE(location) != "connection_1":
-            product_data = get_location_data(
-                location,
-                [
-                    INLET_FLOWRATE(location),
-                    PRODUCT_FLOWRATE(location),
-                    PRODUCT_TANK_VOLUME(location),
-                ],
-                ["inlet_flowrate", "product_flowrate", "product_tank_volume"],
-                start_date,
-                end_date,
-                TRUCKED(location),
-            )
-            product_data["cumulative_inlet"] = calculate_cumulative_flows(
-                product_data.inlet_flowrate, 1 / 1440
-            )
-            (
-                product_data["product_per_M"],
-                product_data["cum_product"],
-            ) = product_calculations(product_data)
-            product_data["cum_liquid_product_flowrate"] = calculate_cumulative_flows(
-                product_data.product_flowrate, 1
-            )
-            product_data["cum_tank"] = calculate_cumulative_tank_volumes(
-                product_data.product_tank_volume, 1
-            )
 
-            inlet_avg, product_avg_gpm, product_vol = calculate_product_summary_stats(
-                product_data
-            )
+def fetch_plan(start_date: dt, end_date: dt):
+    registry = get_registry()
+    requests = plan_requests(product_request, registry.production, start_date, end_date)
+    requests.extend(plan_requests(flow_request, registry, start_date, end_date))
+    requests.extend(
+        plan_requests(pressure_request, registry.with_pressure, start_date, end_date)
+    )
+    return requests
+
+
+def location_figures(location, start_date: dt, end_date: dt, fetch, derived, rows):
+    """Product (None for ``connection_1`` locations) and inlet figure of
+    ``location``; ``rows`` is the span its row counts are added to."""
+    product_figure = None
+    if CONNECTION_TYPE(location) != "connection_1":
+        product_data = derived.frame(
+            fetch,
+            product_request(location, start_date, end_date),
+            PRODUCT_DERIVATIONS,
+        )
+
+        inlet_avg, product_avg_gpm, product_vol = calculate_product_summary_stats(
+            product_data
+        )
+        rows.add_rows(len(product_data))
+        product_figure = FigureSpec(
+            "product_plot",
             (
-                location_product_data[location]["product_figures"],
-                location_product_data[location]["product_axes"],
-            ) = product_plot(
-                product_data, NAME(location), inlet_avg, product_avg_gpm, product_vol
-            )
-        if (
-            INLET_FLOWRATE(location)
-            and DISCHARGE_FLOWRATE(location)
-            and FUEL_FLOWRATE(location)
-        ):
-            tags = [
-                INLET_FLOWRATE(location),
-                FUEL_FLOWRATE(location),
-                DISCHARGE_FLOWRATE(location),
-            ]
-            cols = ["inlet_flowrate", "fuel_flowrate", "discharge_flowrate"]
-        elif not INLET_FLOWRATE(location):
-            tags = [FUEL_FLOWRATE(location), DISCHARGE_FLOWRATE(location)]
-            cols = ["fuel_flowrate", "discharge_flowrate"]
-        elif not DISCHARGE_FLOWRATE(location):
-            tags = [INLET_FLOWRATE(location), FUEL_FLOWRATE(location)]
-            cols = ["inlet_flowrate", "fuel_flowrate"]
-
-        flow_data = get_location_data(
-            location, tags, cols, start_date, end_date, TRUCKED(location),
+                product_data,
+                NAME(location),
+                inlet_avg,
+                product_avg_gpm,
+                product_vol,
+            ),
         )
-        if PIPELINE_PRESSURE(location):
-            pressure_data = get_location_data(
-                location,
-                [PIPELINE_PRESSURE(location)],
-                [INLET_NAMES(location)],
-                start_date,
-                end_date,
-                TRUCKED(location),
-                sum_values=False,
-            )
-            inlet_pressure_avg = calculate_pressure_summary_stats(pressure_data)
-        else:
-            pressure_data = pd.DataFrame()
-            inlet_pressure_avg = pd.Series()
-        inlet_avg, fuel_gas_avg, discharge_avg = calculate_flow_summary_stats(flow_data)
+    flow_data = fetch_request(fetch, flow_request(location, start_date, end_date))
+    rows.add_rows(len(flow_data))
+    if PIPELINE_PRESSURE(location):
+        pressure_data = fetch_request(
+            fetch, pressure_request(location, start_date, end_date)
+        )
+        inlet_pressure_avg = calculate_pressure_summary_stats(pressure_data)
+    else:
+        pressure_data = pd.DataFrame()
+        inlet_pressure_avg = pd.Series()
+    inlet_avg, fuel_gas_avg, discharge_avg = calculate_flow_summary_stats(flow_data)
+    inlet_figure = FigureSpec(
+        "inlet_plot",
         (
-            location_inlet_data[location]["inlet_figures"],
-            location_inlet_data[location]["inlet_axes"],
-        ) = inlet_plot(
             flow_data,
             pressure_data,
             NAME(location),
@@ -130,16 +162,51 @@ def operation():
             fuel_gas_avg,
             discharge_avg,
             inlet_pressure_avg,
-        )
+        ),
+    )
+    return product_figure, inlet_figure
+
 
-    product_figures = [
-        location_product_data[location]["product_figures"]
-        for location in location_product_data
-    ]
+def operation(
+    fetch=get_location_data,
+    max_workers: int = FETCH_WORKERS,
+    timeout: float = FETCH_TIMEOUT,
+    derived: DerivedColumns = None,
+    degraded: DegradedLocations = None,
+):
+    start_date, end_date = report_window()
 
-    inlet_figures = [
-        location_inlet_data[location]["inlet_figures"]
-        for location in location_inlet_data
-    ]
+    fetch = prefetch(
+        fetch_plan(start_date, end_date), fetch, max_workers, timeout
+    ).get_location_data
+    derived = derived or DerivedColumns()
+    degraded = degraded if degraded is not None else DegradedLocations()
+
+    registry = get_registry()
+    production = frozenset(registry.production)
+    product_figures, inlet_figures = [], []
+    for location in registry:
+        with span(str(location)) as location_span:
+            figures = degraded.run(
+                "location_production_model",
+                location,
+                location_figures,
+                location,
+                start_date,
+                end_date,
+                fetch,
+                derived,
+                location_span,
+            )
+        if figures is None:
+            # A location that fails keeps its pages, marked as having no data.
+            product_figure = None
+            if location in production:
+                product_figure = degraded.placeholder(location, "Production Rates")
+            figures = product_figure, degraded.placeholder(location, "Inlet Analysis")
+        product_figure, inlet_figure = figures
+        if product_figure is not None:
+            product_figures.append(product_figure)
+        inlet_figures.append(inlet_figure)
 
     return product_figures, inlet_figures
@@ -1,137 +1,227 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import datetime as dt
-from collections import defaultdict
 import numexpr as ne
+import numpy as np
+import pandas as pd
 
 from reports.config import get_logger
-from reports.templates.daily_plots import product_summary_plot
-from data_tools.utilities.tags import GetTags, TAGS
+from reports.templates.figure_spec import FigureSpec
 from data_tools.utilities.alter_table import (
-    product_calculations,
     calculate_product_totals,
-    calculate_cumulative_flows,
-    calculate_cumulative_tank_volumes,
     get_location_data,
 )
+from reports.utilities.derived import (
+    PRODUCT,
+    DerivedColumns,
+    cumulative_flow,
+    cumulative_tank,
+)
+from reports.settings import FETCH_TIMEOUT, FETCH_WORKERS
+from reports.utilities.fetch_pool import FetchRequest, prefetch
+from reports.utilities.instrumentation import span
+from reports.utilities.isolation import DegradedLocations, plan_requests
 from reports.utilities.log_helper import log_call
+from reports.utilities.registry import field, get_registry
+from reports.utilities.rollup_store import LocationTotals, RollupStore, totals_frame
 
 logger = get_logger(__name__)
 
 ne.set_num_threads(12)
 
-NAME = GetTags().name
-CONNECTION_TYPE = GetTags().connection_type
-DESIGNATION = GetTags().designation
-TRUCKED = GetTags().trucked
-INLET_FLOWRATE = GetTags().inlet_flowrate
-DISCHARGE_FLOWRATE = GetTags().discharge_flowrate
-PRODUCT_TANK_VOLUME = GetTags().product_tank_volume
-PRODUCT_FLOWRATE = GetTags().product_flowrate
+NAME = field("name")
+CONNECTION_TYPE = field("connection_type")
+DESIGNATION = field("designation")
+TRUCKED = field("trucked")
+INLET_FLOWRATE = field("inlet_flowrate")
+DISCHARGE_FLOWRATE = field("discharge_flowrate")
+PRODUCT_TANK_VOLUME = field("product_tank_volume")
+PRODUCT_FLOWRATE = field("product_flowrate")
 
 FREQ = {"connection_1": 1 / 60, "connection_2": 1}
+TREND_DAYS = 7
+DESIGNATIONS = ("UPPER", "LOWER")
 
 
-@log_call(logger=logger)
-def operation():
+def product_request(location, start_date: dt, end_date: dt):
+    if INLET_FLOWRATE(location):
+        flow_tag = INLET_FLOWRATE(location)
+    else:
+        flow_tag = DISCHARGE_FLOWRATE(location)
+    if TRUCKED(location) == "YES":
+        tags = [flow_tag, PRODUCT_TANK_VOLUME(location)]
+        cols = ["inlet_flowrate", "product_tank_volume"]
+    else:
+        tags = [flow_tag, PRODUCT_FLOWRATE(location), PRODUCT_TANK_VOLUME(location)]
+        cols = ["inlet_flowrate", "product_flowrate", "product_tank_volume"]
+    return FetchRequest(location, tags, cols, start_date, end_date, TRUCKED(location))
+
+
+def report_window():
     end_date = dt.datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
-    start_date = end_date - dt.timedelta(days=1)
-
-    product_summary_data = defaultdict(dict)
-
-    upper_product_total = []
-    upper_pumped = []
-    lower_product_total = []
-    lower_pumped = []
-    upper_locations = []
-    lower_locations = []
-    location_type_a = []
-    location_type_b = []
-
-    for location, _ in TAGS:
-        if INLET_FLOWRATE(location):
-            trucked_tags = [INLET_FLOWRATE(location), PRODUCT_TANK_VOLUME(location)]
-            nontrucked_tags = [
-                INLET_FLOWRATE(location),
-                PRODUCT_FLOWRATE(location),
-                PRODUCT_TANK_VOLUME(location),
-            ]
-        else:
-            trucked_tags = [DISCHARGE_FLOWRATE(location), PRODUCT_TANK_VOLUME(location)]
-            nontrucked_tags = [
-                DISCHARGE_FLOWRATE(location),
-                PRODUCT_FLOWRATE(location),
-                PRODUCT_TANK_VOLUME(location),
-            ]
-        if TRUCKED(location) == "YES":
-            product_data = get_location_data(
+    return end_date - dt.timedelta(days=1), end_date
+
+
+def fetch_plan(start_date: dt, end_date: dt):
+    return plan_requests(product_request, get_registry(), start_date, end_date)
+
+
+def product_derivations(location):
+    return [
+        cumulative_flow(
+            "cum_liquid_product_flowrate",
+            "product_flowrate",
+            FREQ[CONNECTION_TYPE(location)],
+        ),
+        cumulative_tank("cum_tank", "product_tank_volume"),
+        PRODUCT,
+    ]
+
+
+def location_product_data(
+    location, start_date: dt, end_date: dt, fetch, derived: DerivedColumns = None
+):
+    derived = derived or DerivedColumns()
+    product_data = derived.frame(
+        fetch,
+        product_request(location, start_date, end_date),
+        product_derivations(location),
+    )
+    product_data["cum_pumped"] = product_data.cum_liquid_product_flowrate
+
+    if CONNECTION_TYPE(location) == "connection_1":
+        product_data = product_data[:-1]
+    return product_data
+
+
+def location_totals(
+    location, start_date: dt, end_date: dt, fetch, derived: DerivedColumns, rows
+):
+    product_data = location_product_data(location, start_date, end_date, fetch, derived)
+    product_total, pumped = calculate_product_totals(location, product_data)
+    rows.add_rows(len(product_data))
+    return product_total, pumped
+
+
+def daily_totals(
+    start_date: dt,
+    end_date: dt,
+    fetch=get_location_data,
+    max_workers: int = FETCH_WORKERS,
+    timeout: float = FETCH_TIMEOUT,
+    derived: DerivedColumns = None,
+    degraded: DegradedLocations = None,
+):
+    """Product total and volume pumped of every location between the dates.
+
+    A location whose totals fail is kept with ``NaN`` totals, which the rollup
+    does not write.
+    """
+    fetch = prefetch(
+        fetch_plan(start_date, end_date), fetch, max_workers, timeout
+    ).get_location_data
+    derived = derived or DerivedColumns()
+    degraded = degraded if degraded is not None else DegradedLocations()
+
+    totals = []
+    for location in get_registry():
+        with span(str(location)) as location_span:
+            product_totals = degraded.run(
+                "summary_production_model",
+                location,
+                location_totals,
                 location,
-                trucked_tags,
-                ["inlet_flowrate", "product_tank_volume"],
                 start_date,
                 end_date,
-                TRUCKED(location),
+                fetch,
+                derived,
+                location_span,
             )
-        else:
-            product_data = get_location_data(
+        product_total, pumped = product_totals or (np.nan, np.nan)
+        totals.append(
+            LocationTotals(
                 location,
-                nontrucked_tags,
-                ["inlet_flowrate", "product_flowrate", "product_tank_volume"],
-                start_date,
-                end_date,
-                TRUCKED(location),
+                NAME(location),
+                CONNECTION_TYPE(location),
+                DESIGNATION(location),
+                product_total,
+                pumped,
             )
-
-        product_data["cum_liquid_product_flowrate"] = calculate_cumulative_flows(
-            product_data.product_flowrate, FREQ[CONNECTION_TYPE(location)]
         )
-        product_data["cum_pumped"] = product_data.cum_liquid_product_flowrate
-        product_data["cum_tank"] = calculate_cumulative_tank_volumes(
-            product_data.product_tank_volume, 1
+    return totals
+
+
+def designation_panels(totals):
+    """Totals of the UPPER and LOWER locations for the daily panel, in location
+    order; a negative or missing product total is shown as 0."""
+    frame = totals_frame(totals)
+    frame["product_total"] = frame.product_total.where(frame.product_total > 0, 0)
+    panels = dict(tuple(frame.groupby("designation", sort=False)))
+    return {
+        designation: panels.get(designation, frame.iloc[:0])
+        for designation in DESIGNATIONS
+    }
+
+
+def backfill(
+    start_day: dt.date,
+    end_day: dt.date,
+    fetch=get_location_data,
+    store: RollupStore = None,
+    max_workers: int = FETCH_WORKERS,
+    timeout: float = FETCH_TIMEOUT,
+):
+    """Rebuild the rollup rows of every day from ``start_day`` to ``end_day``."""
+    store = store or RollupStore()
+    for day in pd.date_range(start_day, end_day, freq="D"):
+        totals = daily_totals(
+            day.to_pydatetime(),
+            (day + pd.Timedelta(days=1)).to_pydatetime(),
+            fetch,
+            max_workers,
+            timeout,
         )
-        _, product_data["cum_product"] = product_calculations(product_data)
-
-        if CONNECTION_TYPE(location) == "connection_1":
-            product_data = product_data[:-1]
-            location_type_b_total, _ = calculate_product_totals(location, product_data)
-            location_type_b.append(location_type_b_total)
-        else:
-            location_type_a_total, _ = calculate_product_totals(location, product_data)
-            location_type_a.append(location_type_a_total)
-
-        if DESIGNATION(location) == "UPPER":
-            product_total_upper, product_pumped_upper = calculate_product_totals(
-                location, product_data
-            )
-            if product_total_upper > 0:
-                upper_product_total.append(product_total_upper)
-            else:
-                upper_product_total.append(0)
-            upper_pumped.append(product_pumped_upper)
-            upper_locations.append(NAME(location))
-
-        if DESIGNATION(location) == "LOWER":
-            product_total_lower, product_pumped_lower = calculate_product_totals(
-                location, product_data
-            )
-            if product_total_lower > 0:
-                lower_product_total.append(product_total_lower)
-            else:
-                lower_product_total.append(0)
-            lower_pumped.append(product_pumped_lower)
-            lower_locations.append(NAME(location))
-
-    (
-        product_summary_data["summary_figure"],
-        product_summary_data["summary_axes"],
-    ) = product_summary_plot(
-        upper_locations,
-        lower_locations,
-        upper_product_total,
-        upper_pumped,
-        lower_product_total,
-        lower_pumped,
+        store.write(day.date(), totals)
+
+
+@log_call(logger=logger)
+def operation(
+    fetch=get_location_data,
+    max_workers: int = FETCH_WORKERS,
+    timeout: float = FETCH_TIMEOUT,
+    store: RollupStore = None,
+    derived: DerivedColumns = None,
+    degraded: DegradedLocations = None,
+):
+    start_date, end_date = report_window()
+
+    totals = daily_totals(
+        start_date, end_date, fetch, max_workers, timeout, derived, degraded
     )
-    product_summary_figure = [product_summary_data["summary_figure"]]
+    # The weekly panel reads earlier days from the rollup instead of the historian.
+    store = store or RollupStore()
+    store.write(start_date.date(), totals)
+    trend = store.trend(start_date.date(), TREND_DAYS)
+
+    panels = designation_panels(totals)
+    upper, lower = panels["UPPER"], panels["LOWER"]
+
+    product_summary_figure = [
+        FigureSpec(
+            "product_summary_plot",
+            (
+                upper.name.tolist(),
+                lower.name.tolist(),
+                upper.product_total.tolist(),
+                upper.pumped.tolist(),
+                lower.product_total.tolist(),
+                lower.pumped.tolist(),
+                list(trend.index),
+                trend.location_type_a.tolist(),
+                trend.location_type_b.tolist(),
+                trend.total.tolist(),
+            ),
+        )
+    ]
 
     return product_summary_figure
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Folders, files and limits of the reports, read from the environment"""
+from __future__ import annotations
+
+import os
+
+from pathlib import Path
+
+from reports.config import load_environment
+
+load_environment()
+
+REPORTS_HOME = Path.home() / ".prod_reports"
+
+STORE_ROOT = Path(os.getenv("MINUTE_STORE", REPORTS_HOME / "minute_store"))
+ROLLUP_DB = Path(os.getenv("ROLLUP_DB", REPORTS_HOME / "daily_production.sqlite"))
+METRICS_ROOT = Path(os.getenv("REPORT_METRICS", REPORTS_HOME / "metrics"))
+PROFILE_ROOT = REPORTS_HOME / "profiles"
+PAGE_CACHE_ROOT = Path(os.getenv("PAGE_CACHE", REPORTS_HOME / "page_cache"))
+PAGE_CACHE_BYTES = 512 * 2**20
+RUNS_ROOT = Path(os.getenv("REPORT_RUNS", REPORTS_HOME / "runs"))
+# Days a run folder is kept after its last completed stage.
+RUNS_KEEP_DAYS = 14
+OUTPUT_ROOT = Path(
+    os.getenv(
+        "TANK_VOLUME_OUTPUT", "C:\\Users\\user1\\Projects\\data_files\\chem_report_data"
+    )
+)
+
+FETCH_WORKERS = 8
+FETCH_TIMEOUT = 300
+LOCATION_TIMEOUT = 600
+# Time of day the full report is due, as HH:MM.
+DELIVERY_DEADLINE = os.getenv("REPORT_DEADLINE", "07:00")
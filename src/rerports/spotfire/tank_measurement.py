@@ -1,88 +1,374 @@
 import datetime as dt
+import time
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional
 
 import numexpr as ne
+import pandas as pd
 
+from reports.config import get_logger
+from reports.settings import LOCATION_TIMEOUT, OUTPUT_ROOT
 from reports.algorithms.fill_and_drain_inference import (
     calculate_chemical_usage,
     infer_fill_and_drain,
 )
-from reports.utilities.configuration import CONFIGURATION, Configuration
 from reports.utilities.data_builder import get_location_data
+from reports.utilities.isolation import DeadlineExceeded, call_with_deadline
+from reports.utilities.registry import field, get_registry
+
+logger = get_logger(__name__)
 
 ne.set_num_threads(12)
 
-CONNECTION_TYPE = Configuration().connection_type
-INLET_FLOWRATE = Configuration().inlet_flowrate
-TRUCKED = Configuration().trucked
-CHEMICAL_A_VOLUME = Configuration().chemical_a_volume
-CHEMICAL_A = Configuration().chemical_a
-CHEMICAL_B_VOLUME = Configuration().chemical_b_volume
-CHEMICAL_B = Configuration().chemical_b
-CHEMICAL_C_VOLUME = Configuration().chemical_c_volume
-CHEMICAL_C = Configuration().chemical_c
-CHEMICAL_D_VOLUME = Configuration().chemical_d_volume
-CHEMICAL_D = Configuration().chemical_d
-CHEMICAL_E_VOLUME = Configuration().chemical_e_volume
-CHEMICAL_E = Configuration().chemical_e
-
-
-def get_tank_volume():
-    """
-    Generates csv file to be used in spotfire analysis for chemical consumption.
+CONNECTION_TYPE = field("connection_type")
+INLET_FLOWRATE = field("inlet_flowrate")
+TRUCKED = field("trucked")
+CHEMICAL_A_VOLUME = field("chemical_a_volume")
+CHEMICAL_A = field("chemical_a")
+CHEMICAL_B_VOLUME = field("chemical_b_volume")
+CHEMICAL_B = field("chemical_b")
+CHEMICAL_C_VOLUME = field("chemical_c_volume")
+CHEMICAL_C = field("chemical_c")
+CHEMICAL_D_VOLUME = field("chemical_d_volume")
+CHEMICAL_D = field("chemical_d")
+CHEMICAL_E_VOLUME = field("chemical_e_volume")
+CHEMICAL_E = field("chemical_e")
+
+TANKS = {
+    "chemical_a": (CHEMICAL_A_VOLUME, CHEMICAL_A),
+    "chemical_b": (CHEMICAL_B_VOLUME, CHEMICAL_B),
+    "chemical_c": (CHEMICAL_C_VOLUME, CHEMICAL_C),
+    "chemical_d": (CHEMICAL_D_VOLUME, CHEMICAL_D),
+    "chemical_e": (CHEMICAL_E_VOLUME, CHEMICAL_E),
+}
+
+EXPORT_FORMATS = ("csv", "parquet")
+DATASET_NAME = "tank_volume"
+CATEGORICAL_COLUMNS = ["location", "tank"]
+
+
+def dataset_partition(output_root: Path, report_date: dt.date) -> Path:
+    return output_root / DATASET_NAME / f"report_date={report_date.isoformat()}"
+
+
+def write_dataset(frames, output_root: Path):
+    """Write every (location, chemical) frame to one Parquet dataset by report date.
+
+    Rewriting a report date replaces that day's partition.
     """
-    end_date = dt.datetime.today().replace(hour=7, minute=0, second=0, microsecond=0)
-    start_date = end_date - dt.timedelta(hours=24)
-    for location, _ in CONFIGURATION:
-        if location != "Location_I" and CONNECTION_TYPE(location) != "connection_1":
-            tags = [
-                CHEMICAL_A_VOLUME,
-                CHEMICAL_B_VOLUME,
-                CHEMICAL_C_VOLUME,
-                CHEMICAL_D_VOLUME,
-                CHEMICAL_E_VOLUME,
+    data = pd.concat(frames, ignore_index=True)
+    data[CATEGORICAL_COLUMNS] = data[CATEGORICAL_COLUMNS].astype("category")
+    data.to_parquet(
+        output_root / DATASET_NAME,
+        partition_cols=["report_date"],
+        index=False,
+        existing_data_behavior="delete_matching",
+    )
+
+
+def mark_peaks(data, valid_fwd_values, valid_bkwd_values):
+    """Set ``peak_locs`` to 1 on every minute a fill or drain peak was found."""
+    data["peak_locs"] = 0
+    if valid_fwd_values[0]["row_num"] != 0 and valid_bkwd_values[0]["row_num"] != 0:
+        peak_times = pd.DatetimeIndex(
+            [
+                row["peak_min_time"]
+                for pair in zip(valid_fwd_values, valid_bkwd_values)
+                for row in pair
             ]
-            chems = [CHEMICAL_A, CHEMICAL_B, CHEMICAL_C, CHEMICAL_D, CHEMICAL_E]
-            for tag, chem in zip(tags, chems):
+        )
+        data.loc[data.index.isin(peak_times), "peak_locs"] = 1
+    return data
+
+
+class TankPair(NamedTuple):
+    location: str
+    chemical: str
+    volume: Callable
+    name: Callable
+
+
+class PairResult(NamedTuple):
+    location: str
+    chemical: str
+    status: str
+    timings: Dict[str, float]
+    error: Optional[str] = None
+
+
+def tank_pairs():
+    return [
+        TankPair(location, chemical, volume, name)
+        for location in get_registry().consumption
+        for chemical, (volume, name) in TANKS.items()
+    ]
+
+
+def fetch_tank_data(pair: TankPair, start_date: dt.datetime, end_date: dt.datetime):
+    return get_location_data(
+        pair.location,
+        [INLET_FLOWRATE(pair.location), pair.volume(pair.location)],
+        ["inlet_flowrate", "tank_volume"],
+        start_date,
+        end_date,
+        TRUCKED(pair.location),
+    )
+
+
+def prepare_tank_data(data, location, tank, start_date, end_date):
+    """Infer fills and drains and add the columns the spotfire analysis reads."""
+    valid_fwd_values, valid_bkwd_values, _ = infer_fill_and_drain(
+        data, start_date, end_date
+    )
+    vol_used = calculate_chemical_usage(valid_fwd_values, valid_bkwd_values)
+    data["datetime"] = data.index
+    data["vol_used"] = vol_used
+    data["location"] = str(location)
+    data["tank"] = tank.upper()
+    return mark_peaks(data, valid_fwd_values, valid_bkwd_values)
+
+
+def write_tank_csv(data, location, tank, output_root: Path):
+    data.to_csv(output_root / f"{location}_{tank}.csv", index=False)
+
+
+def timed(func, *args, timeout: Optional[float] = None):
+    """``func(*args)`` and its seconds, failing after ``timeout`` seconds."""
+    start = time.perf_counter()
+    result = call_with_deadline(func, timeout, *args)
+    return result, time.perf_counter() - start
+
+
+def missing_tag(pair: TankPair) -> Optional[KeyError]:
+    """The registry's ``KeyError`` for a tag ``pair`` has none of, if any."""
+    try:
+        for lookup in (INLET_FLOWRATE, TRUCKED, pair.volume, pair.name):
+            lookup(pair.location)
+    except KeyError as err:
+        return err
+    return None
+
+
+def pair_result(pair: TankPair, timings, error=None):
+    status = "succeeded" if error is None else "failed"
+    return PairResult(
+        pair.location, pair.chemical, status, timings, error and repr(error)
+    )
+
+
+def run_serial(pairs, start_date, end_date, output_root, export_format, timeout):
+    results, frames = [], []
+    for pair in pairs:
+        timings = {}
+        try:
+            data, timings["fetch"] = timed(
+                fetch_tank_data, pair, start_date, end_date, timeout=timeout
+            )
+            tank = pair.name(pair.location)
+            data, timings["infer"] = timed(
+                prepare_tank_data,
+                data,
+                pair.location,
+                tank,
+                start_date,
+                end_date,
+                timeout=timeout,
+            )
+            if export_format == "csv":
+                _, timings["write"] = timed(
+                    write_tank_csv,
+                    data,
+                    pair.location,
+                    tank,
+                    output_root,
+                    timeout=timeout,
+                )
+            else:
+                frames.append(data)
+        except Exception as err:
+            results.append(pair_result(pair, timings, err))
+        else:
+            results.append(pair_result(pair, timings))
+    return results, frames
+
+
+def run_parallel(
+    pairs, start_date, end_date, output_root, export_format, workers, timeout
+):
+    """Fetch and write in threads and infer fills and drains in processes.
+
+    Inference deadlines are kept here rather than in the worker processes.
+    Once every inference has a result or has missed its deadline, the worker
+    processes of any stuck one are terminated, so neither the export nor the
+    interpreter's exit waits for it.
+    """
+    timings = [{} for _ in pairs]
+    errors = {}
+    prepared = {}
+    stuck = False
+    cpu_pool = ProcessPoolExecutor(workers)
+    try:
+        with ThreadPoolExecutor(workers) as io_pool:
+            fetches = {
+                io_pool.submit(
+                    timed, fetch_tank_data, pair, start_date, end_date, timeout=timeout
+                ): idx
+                for idx, pair in enumerate(pairs)
+            }
+            inferences = {}
+            for future in as_completed(fetches):
+                idx = fetches[future]
+                pair = pairs[idx]
                 try:
-                    data = get_location_data(
-                        location,
-                        [INLET_FLOWRATE(location), tag(location)],
-                        ["inlet_flowrate", "tank_volume"],
-                        start_date,
-                        end_date,
-                        TRUCKED(location),
-                    )
-                    valid_fwd_values, valid_bkwd_values, _ = infer_fill_and_drain(
-                        data, start_date.replace(hour=7), end_date.replace(hour=7),
-                    )
-                    vol_used = calculate_chemical_usage(
-                        valid_fwd_values, valid_bkwd_values
-                    )
-                    data["datetime"] = data.index
-                    data["vol_used"] = [vol_used] * len(data)
-                    data["location"] = [str(location)] * len(data)
-                    data["tank"] = [f"{chem(location).upper()}"] * len(data)
-                    data["peak_locs"] = [0] * len(data)
-                    if (
-                        valid_fwd_values[0]["row_num"] != 0
-                        and valid_bkwd_values[0]["row_num"] != 0
-                    ):
-                        for fwd_row, bkwd_row in zip(
-                            valid_fwd_values, valid_bkwd_values
-                        ):
-                            data.peak_locs.loc[
-                                data.datetime == fwd_row["peak_min_time"]
-                            ] = 1
-                            data.peak_locs.loc[
-                                data.datetime == bkwd_row["peak_min_time"]
-                            ] = 1
-
-                    data.to_csv(
-                        f"C:\\Users\\user1\\Projects\\data_files\\chem_report_data\\{location}_{chem(location)}.csv",
-                        index=False,
+                    data, timings[idx]["fetch"] = future.result()
+                    tank = pair.name(pair.location)
+                except Exception as err:
+                    errors[idx] = err
+                    continue
+                job = cpu_pool.submit(
+                    timed,
+                    prepare_tank_data,
+                    data,
+                    pair.location,
+                    tank,
+                    start_date,
+                    end_date,
+                )
+                # A pair queued behind others gets a turn for each batch ahead.
+                deadline = None
+                if timeout is not None:
+                    turns = 1 + len(inferences) // workers
+                    deadline = time.monotonic() + timeout * turns
+                inferences[job] = idx, tank, deadline
+
+            writes = {}
+            for future, (idx, tank, deadline) in inferences.items():
+                remaining = None
+                if deadline is not None:
+                    remaining = max(0, deadline - time.monotonic())
+                try:
+                    data, timings[idx]["infer"] = future.result(remaining)
+                except Exception as err:
+                    if not future.done():
+                        stuck = True
+                        err = DeadlineExceeded(f"no result after {timeout}s")
+                    errors[idx] = err
+                    continue
+                if export_format == "csv":
+                    job = io_pool.submit(
+                        timed,
+                        write_tank_csv,
+                        data,
+                        pairs[idx].location,
+                        tank,
+                        output_root,
+                        timeout=timeout,
                     )
-                except KeyError:
-                    pass
+                    writes[job] = idx
+                else:
+                    prepared[idx] = data
+
+            for future in as_completed(writes):
+                idx = writes[future]
+                try:
+                    _, timings[idx]["write"] = future.result()
+                except Exception as err:
+                    errors[idx] = err
+    finally:
+        processes = list((getattr(cpu_pool, "_processes", None) or {}).values())
+        cpu_pool.shutdown(wait=False, cancel_futures=True)
+        if stuck:
+            for process in processes:
+                process.terminate()
+
+    results = [
+        pair_result(pair, timings[idx], errors.get(idx))
+        for idx, pair in enumerate(pairs)
+    ]
+    return results, [prepared[idx] for idx in sorted(prepared)]
+
+
+def summarize(results):
+    counts = Counter(result.status for result in results)
+    logger.info(
+        "Tank volume export: %s succeeded, %s skipped, %s failed",
+        counts["succeeded"],
+        counts["skipped"],
+        counts["failed"],
+    )
+    for result in results:
+        seconds = sum(result.timings.values())
+        if result.status == "succeeded":
+            logger.info("%s %s: %.2fs", result.location, result.chemical, seconds)
+        else:
+            logger.warning(
+                "%s %s %s after %.2fs: %s",
+                result.location,
+                result.chemical,
+                result.status,
+                seconds,
+                result.error,
+            )
+    return counts
+
+
+def get_tank_volume(
+    output_root: Path = OUTPUT_ROOT,
+    export_format: str = "csv",
+    new_days_only: bool = False,
+    workers: Optional[int] = None,
+    timeout: Optional[float] = LOCATION_TIMEOUT,
+):
+    """
+    Generates the tank volume data used in spotfire analysis for chemical consumption.
+
+    ``csv`` writes one file per location and chemical; ``parquet`` writes a single
+    dataset partitioned by report date under ``output_root``. With
+    ``new_days_only`` a report date already in the dataset is not fetched again.
+    With ``workers`` set the pairs run in parallel. Each fetch, inference and
+    write of a pair fails after ``timeout`` seconds. Returns a ``PairResult``
+    per location and chemical; pairs with a tag missing from the registry are
+    skipped and any other error fails the pair.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"export_format must be one of {EXPORT_FORMATS}")
+    end_date = dt.datetime.today().replace(hour=7, minute=0, second=0, microsecond=0)
+    start_date = end_date - dt.timedelta(hours=24)
+    report_date = start_date.date()
+    if (
+        export_format == "parquet"
+        and new_days_only
+        and dataset_partition(output_root, report_date).exists()
+    ):
+        return []
+
+    pairs, skipped = [], []
+    for pair in tank_pairs():
+        error = missing_tag(pair)
+        if error is None:
+            pairs.append(pair)
+        else:
+            skipped.append(
+                PairResult(pair.location, pair.chemical, "skipped", {}, repr(error))
+            )
+    if workers:
+        results, frames = run_parallel(
+            pairs, start_date, end_date, output_root, export_format, workers, timeout
+        )
+    else:
+        results, frames = run_serial(
+            pairs, start_date, end_date, output_root, export_format, timeout
+        )
+    results = skipped + results
+    if frames:
+        for data in frames:
+            data["report_date"] = report_date.isoformat()
+        write_dataset(frames, output_root)
+    summarize(results)
+    return results
 
 
 if __name__ == "__main__":
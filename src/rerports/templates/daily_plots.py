@@ -20,7 +20,6 @@ plt.rcParams["figure.figsize"] = [15, 10]
 plt.rcParams["axes.titleweight"] = "bold"
 plt.rcParams["figure.titlesize"] = "large"
 plt.rcParams["figure.titleweight"] = "bold"
-plt.rcParams["figure.max_open_warning"] = 0
 
 
 def autolabel(data, axis, name=None):
@@ -63,40 +62,35 @@ def set_ticks(axis, data, which):
             "low": {"scale": 1.4, "step": 1},
         },
     }
-    if data.max() > 40:
-        try:
-            scaled_axis = axis.set_yticks(
-                np.arange(
-                    0,
-                    data.max() * scale[which]["high"]["scale"],
-                    scale[which]["high"]["step"],
-                )
-            )
-        except ValueError:
-            pass
-    elif data.max() < 10:
-        try:
-            scaled_axis = axis.set_yticks(
-                np.arange(
-                    0,
-                    data.max() * scale[which]["low"]["scale"],
-                    scale[which]["low"]["step"],
-                )
-            )
-        except ValueError:
-            pass
+    top = data.max()
+    if top > 40:
+        level = "high"
+    elif top < 10:
+        level = "low"
     else:
-        try:
-            scaled_axis = axis.set_yticks(
-                np.arange(
-                    0,
-                    data.max() * scale[which]["med"]["scale"],
-                    scale[which]["med"]["step"],
-                )
-            )
-        except ValueError:
-            pass
-    return scaled_axis
+        level = "med"
+    ticks = scale[which][level]
+    # An empty or all-NaN column has no ticks to set and keeps the default axis.
+    try:
+        return axis.set_yticks(np.arange(0, top * ticks["scale"], ticks["step"]))
+    except ValueError:
+        return None
+
+
+def set_time_axis(axis, index, fast=False):
+    """Hourly labels and 15 minute minor ticks along a day of minute data.
+
+    The labels are rotated either way; ``fast`` skips building a tick and
+    label for every minute of ``index`` only to replace them.
+    """
+    if fast:
+        axis.tick_params(axis="x", labelrotation=90)
+    else:
+        axis.set_xticks(index)
+        axis.set_xticklabels(index, rotation="vertical")
+    axis.xaxis.set_major_locator(HourLocator(interval=1))
+    axis.xaxis.set_minor_locator(MinuteLocator(interval=15))
+    axis.xaxis.set_major_formatter(DateFormatter("%I:%M %p"))
 
 
 def inlet_plot(
@@ -107,6 +101,7 @@ def inlet_plot(
     fuel_gas_avg,
     discharge_avg,
     inlet_pressure_avg,
+    fast=False,
 ):
     fig, (flow, psi) = plt.subplots(2, sharex=True)
     fig.suptitle(f"{location_type_b_name} Inlet Analysis", size=20, ha="left", x=0.1)
@@ -133,11 +128,7 @@ def inlet_plot(
         set_ticks(flow, df_1.inlet_flowrate, "flow")
 
     flow.set_ylabel("SCFD (Inlet & Discharge)")
-    flow.set_xticks(df_1.index)
-    flow.set_xticklabels(df_1.index, rotation="vertical")
-    flow.xaxis.set_major_locator(HourLocator(interval=1))
-    flow.xaxis.set_minor_locator(MinuteLocator(interval=15))
-    flow.xaxis.set_major_formatter(DateFormatter("%I:%M %p"))
+    set_time_axis(flow, df_1.index, fast)
 
     fuel = flow.twinx()
     fuel.plot(df_1.index, df_1.fuel_flowrate, color="#0a481e", label="Fuel Gas")
@@ -168,11 +159,7 @@ def inlet_plot(
 
     psi.set_ylabel("PSI")
 
-    psi.set_xticks(df_1.index)
-    psi.set_xticklabels(df_1.index, rotation="vertical")
-    psi.xaxis.set_major_locator(HourLocator(interval=1))
-    psi.xaxis.set_minor_locator(MinuteLocator(interval=15))
-    psi.xaxis.set_major_formatter(DateFormatter("%I:%M %p"))
+    set_time_axis(psi, df_1.index, fast)
 
     if not df_2.empty:
         psi_color = {
@@ -222,7 +209,9 @@ def inlet_plot(
     return fig, (flow, psi)
 
 
-def product_plot(df, location_type_b_name, inlet_avg, product_avg_gpm, product_vol):
+def product_plot(
+    df, location_type_b_name, inlet_avg, product_avg_gpm, product_vol, fast=False
+):
     fig, (gpm, gal) = plt.subplots(2, sharex=True)
     fig.suptitle(f"{location_type_b_name} Production Rates", size=20, ha="left", x=0.1)
 
@@ -262,17 +251,12 @@ def product_plot(df, location_type_b_name, inlet_avg, product_avg_gpm, product_v
 
     gal.fill_between(df.index, 0, df.cum_product / 42, color="#789b73")
 
-    gal.set_xticks(df.index)
-    gal.set_xticklabels(df.index, rotation="vertical")
-    gal.xaxis.set_major_locator(HourLocator(interval=1))
-    gal.xaxis.set_minor_locator(MinuteLocator(interval=15))
-    gal.xaxis.set_major_formatter(DateFormatter("%I:%M %p"))
+    set_time_axis(gal, df.index, fast)
 
     textstr = (
         "$Inlet~Avg=%.2f~SCFD$\n$Product~Avg=%.2f~gal$/$M$\n$Product~Total=%.2f~gal$"
-        % (inlet_avg, product_avg_gpm, product_vol,)
+        % (inlet_avg, product_avg_gpm, product_vol)
     )
-
     text_box = AnchoredText(textstr, frameon=True, loc=2, pad=0.01)
 
     plt.setp(text_box.patch, boxstyle="round", facecolor="#ada587", alpha=0.5)
@@ -536,7 +520,7 @@ def product_summary_plot(
         days_in_week,
         weekly_location_type_b_prod,
         label="Location Type B Production",
-        color="#045producta",
+        color="#045c5a",
     )
 
     weekly.set_ylabel("gal")
@@ -613,3 +597,14 @@ def product_summary_plot(
     gs.tight_layout(fig, pad=0)
 
     return fig, (daily, weekly)
+
+
+def no_data_plot(title, reason=None):
+    """Placeholder page for a location whose figure could not be built."""
+    fig, ax = plt.subplots()
+    fig.suptitle(title, size=20, ha="left", x=0.1)
+    ax.axis("off")
+    ax.text(0.5, 0.55, "No Data", ha="center", va="center", size=48, color="#7f7f7f")
+    if reason:
+        ax.text(0.5, 0.4, reason, ha="center", va="center", size=12, wrap=True)
+    return fig, ax
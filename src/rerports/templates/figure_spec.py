@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""Figures described by their template call, built only when rendered"""
+from __future__ import annotations
+
+from typing import NamedTuple, Optional
+
+
+class FigureSpec(NamedTuple):
+    """A deferred call to one of the ``daily_plots`` templates."""
+
+    template: str
+    args: tuple
+    kwargs: Optional[dict] = None
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Rendered PDF pages kept on disk, keyed by a hash of their template call"""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import os
+
+from pathlib import Path
+from typing import Optional
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from reports.config import get_logger
+from reports.settings import PAGE_CACHE_BYTES, PAGE_CACHE_ROOT
+from reports.templates import daily_plots
+from reports.templates.figure_spec import FigureSpec
+
+logger = get_logger(__name__)
+
+SCALARS = (str, bytes, int, float, bool, type(None), np.generic, dt.date, dt.timedelta)
+
+
+class Unhashable(TypeError):
+    """An argument of a template call that has no stable content hash."""
+
+
+def _templates_digest() -> str:
+    """Changes whenever the templates, the page rendering or matplotlib do, so
+    old pages go stale."""
+    digest = hashlib.sha256()
+    # render.py imports this module, so it is read by path.
+    for source in (Path(daily_plots.__file__), Path(__file__).with_name("render.py")):
+        digest.update(source.read_bytes())
+    digest.update(matplotlib.__version__.encode("utf8"))
+    return digest.hexdigest()
+
+
+def _feed(digest, value):
+    """Add ``value``'s type and content to ``digest``."""
+    digest.update(type(value).__name__.encode("utf8"))
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        labels = value.columns if isinstance(value, pd.DataFrame) else value.name
+        digest.update(repr(labels).encode("utf8"))
+        digest.update(repr(value.dtypes).encode("utf8"))
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype, value.shape)).encode("utf8"))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(str(len(value)).encode("utf8"))
+        for item in value:
+            _feed(digest, item)
+    elif isinstance(value, dict):
+        digest.update(str(len(value)).encode("utf8"))
+        for key in sorted(value, key=repr):
+            _feed(digest, key)
+            _feed(digest, value[key])
+    elif isinstance(value, SCALARS):
+        digest.update(repr(value).encode("utf8"))
+    else:
+        raise Unhashable(type(value).__name__)
+
+
+class PageCache:
+    """One PDF page per template call under ``root``, at most ``max_bytes`` in all.
+
+    Pages are keyed by the template, its arguments, the render settings and the
+    template code, so a rerun only renders pages whose inputs changed. Reading
+    a page marks it as used; the least recently used pages are evicted first.
+    """
+
+    def __init__(self, root: Path = PAGE_CACHE_ROOT, max_bytes: int = PAGE_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "uncached": 0, "evicted": 0}
+        self._templates = _templates_digest()
+
+    def key(self, figure, dpi: int, fast: bool) -> Optional[str]:
+        """Content hash of ``figure``'s template call, or None if it has none."""
+        if not isinstance(figure, FigureSpec):
+            return None
+        digest = hashlib.sha256(self._templates.encode("utf8"))
+        try:
+            _feed(digest, (figure.template, figure.args, figure.kwargs, dpi, fast))
+        except TypeError as err:
+            logger.debug("Not caching %s: %s argument", figure.template, err)
+            return None
+        return digest.hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pdf"
+
+    def get(self, key: Optional[str]) -> Optional[bytes]:
+        if key is None:
+            self.stats["uncached"] += 1
+            return None
+        page_file = self._file(key)
+        try:
+            page = page_file.read_bytes()
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        os.utime(page_file)
+        self.stats["hits"] += 1
+        return page
+
+    def put(self, key: Optional[str], page: bytes):
+        if key is None:
+            return
+        page_file = self._file(key)
+        page_file.parent.mkdir(parents=True, exist_ok=True)
+        partial = page_file.with_name(page_file.name + ".partial")
+        partial.write_bytes(page)
+        os.replace(partial, page_file)
+
+    def evict(self):
+        """Drop the least recently used pages until the cache fits ``max_bytes``."""
+        pages = []
+        for page_file in self.root.glob("*/*.pdf"):
+            stat = page_file.stat()
+            pages.append((stat.st_mtime, stat.st_size, page_file))
+        total = sum(size for _, size, _ in pages)
+        for _, size, page_file in sorted(pages):
+            if total <= self.max_bytes:
+                break
+            page_file.unlink()
+            total -= size
+            self.stats["evicted"] += 1
+
+    def report(self):
+        logger.info(
+            "Page cache: %s hits, %s misses, %s uncached, %s evicted",
+            self.stats["hits"],
+            self.stats["misses"],
+            self.stats["uncached"],
+            self.stats["evicted"],
+        )
+        return dict(self.stats)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Build report figures from their template calls and write them to PDF"""
+from __future__ import annotations
+
+import io
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Optional
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+from reports.config import get_logger
+from reports.templates import daily_plots
+from reports.templates.figure_spec import FigureSpec
+from reports.utilities.instrumentation import span
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # pragma: no cover - only needed for parallel rendering
+    PdfReader = PdfWriter = None
+
+logger = get_logger(__name__)
+
+DPI = 300
+# Pages queued per render process, so workers stay busy without the whole
+# report waiting in memory.
+PAGES_PER_PROCESS = 2
+# Templates that take ``fast`` to skip tick and text work that is thrown away.
+FAST_TEMPLATES = ("inlet_plot", "product_plot")
+# Position of the location name in each per-location template's arguments,
+# and the title of its page.
+PAGE_TITLES = {
+    "inlet_plot": (2, "Inlet Analysis"),
+    "product_plot": (1, "Production Rates"),
+    "consum_measured_analysis": (2, "Chemical A Tank Volume Analysis"),
+}
+
+
+def page_title(figure: FigureSpec) -> str:
+    if figure.template in PAGE_TITLES:
+        position, title = PAGE_TITLES[figure.template]
+        return f"{figure.args[position]} {title}"
+    return figure.template
+
+
+def build_figure(figure: Any, fast: bool = False) -> Figure:
+    """The figure of ``figure``; a template that fails gives a "No Data" page."""
+    if isinstance(figure, FigureSpec):
+        template = getattr(daily_plots, figure.template)
+        kwargs = figure.kwargs or {}
+        if fast and figure.template in FAST_TEMPLATES:
+            kwargs = {**kwargs, "fast": True}
+        open_figures = set(plt.get_fignums())
+        try:
+            figure, _ = template(*figure.args, **kwargs)
+        except Exception as err:
+            logger.warning("%s failed, adding a No Data page: %r", figure.template, err)
+            for number in set(plt.get_fignums()) - open_figures:
+                plt.close(number)
+            figure, _ = daily_plots.no_data_plot(page_title(figure), repr(err))
+    return figure
+
+
+def save_page(pdf_file: PdfPages, figure: Any, dpi: int = DPI, fast: bool = False):
+    """Write one page and close its figure so only one is ever open."""
+    figure = build_figure(figure, fast)
+    try:
+        pdf_file.savefig(figure, dpi=dpi, bbox_inches="tight")
+    finally:
+        plt.close(figure)
+
+
+def render_page(figure: Any, dpi: int = DPI, fast: bool = False) -> bytes:
+    """Render a single figure to the bytes of a one page PDF."""
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf_file:
+        save_page(pdf_file, figure, dpi, fast)
+    return buffer.getvalue()
+
+
+def merge_pages(file, pages):
+    writer = PdfWriter()
+    for page in pages:
+        writer.append(PdfReader(io.BytesIO(page)))
+    with open(file, "wb") as f:
+        writer.write(f)
+
+
+def drain(*groups):
+    """Yield from each list in turn, dropping every item once it is handed out."""
+    for group in groups:
+        group.reverse()
+        while group:
+            yield group.pop()
+
+
+def _init_worker():
+    matplotlib.use("Agg")
+
+
+def in_order(pages, window: int):
+    """Yield the ``(key, page)`` of ``pages`` in order, waiting on pages that are
+    still rendering; no more of ``pages`` is read while ``window`` wait."""
+    waiting = deque()
+    for item in pages:
+        waiting.append(item)
+        while waiting and (
+            len(waiting) > window or not isinstance(waiting[0][1], Future)
+        ):
+            key, page = waiting.popleft()
+            yield key, page.result() if isinstance(page, Future) else page
+    for key, page in waiting:
+        yield key, page.result() if isinstance(page, Future) else page
+
+
+def cached_pages(
+    figures,
+    cache,
+    dpi: int = DPI,
+    fast: bool = False,
+    pool=None,
+    window: int = PAGES_PER_PROCESS,
+):
+    """Yield the page of each of ``figures`` in order, rendering only cache misses.
+
+    With a process ``pool`` the missing pages are rendered in its workers, with
+    at most ``window`` of them submitted ahead of the page being merged.
+    """
+
+    def pages():
+        for figure in figures:
+            key = cache.key(figure, dpi, fast)
+            page = cache.get(key)
+            if page is None and pool is not None:
+                # Only the pages rendered in the pool keep their key, to be
+                # stored once they come back.
+                yield key, pool.submit(render_page, figure, dpi, fast)
+                continue
+            if page is None:
+                name = getattr(figure, "template", "figure")
+                with span(f"page {name}"):
+                    page = render_page(figure, dpi, fast)
+                cache.put(key, page)
+            yield None, page
+
+    for key, page in in_order(pages(), window):
+        cache.put(key, page)
+        yield page
+
+
+def render_pdf(
+    file,
+    figures,
+    processes: Optional[int] = None,
+    dpi: int = DPI,
+    fast: bool = False,
+    cache=None,
+):
+    """Write ``figures`` (figures or ``FigureSpec``s) to ``file`` in order.
+
+    ``figures`` may be any iterable; each page is written and closed before the
+    next one is built. With ``processes`` set every page is built and rendered
+    in a worker process and the pages are merged in order as they come back,
+    with at most ``PAGES_PER_PROCESS`` pages per process waiting. ``fast``
+    builds the time series templates in their fast mode. With a ``PageCache``
+    only pages whose template call changed are rendered.
+    """
+    if (processes or cache is not None) and PdfWriter is None:
+        logger.warning("pypdf is not installed, rendering figures serially")
+        processes = cache = None
+
+    if cache is not None:
+        if processes:
+            with ProcessPoolExecutor(
+                max_workers=processes, initializer=_init_worker
+            ) as pool:
+                window = PAGES_PER_PROCESS * processes
+                merge_pages(file, cached_pages(figures, cache, dpi, fast, pool, window))
+        else:
+            merge_pages(file, cached_pages(figures, cache, dpi, fast))
+        cache.evict()
+        return
+
+    if not processes:
+        with PdfPages(file) as pdf_file:
+            for figure in figures:
+                name = getattr(figure, "template", "figure")
+                with span(f"page {name}"):
+                    save_page(pdf_file, figure, dpi, fast)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        pages = (
+            (None, pool.submit(render_page, figure, dpi, fast)) for figure in figures
+        )
+        window = PAGES_PER_PROCESS * processes
+        merge_pages(file, (page for _, page in in_order(pages, window)))
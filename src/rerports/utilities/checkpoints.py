@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Run folder of a report whose stages can be resumed after a failure"""
+from __future__ import annotations
+
+import pickle
+import shutil
+import time
+
+from pathlib import Path
+from typing import Optional
+
+from reports.config import get_logger
+from reports.settings import RUNS_KEEP_DAYS, RUNS_ROOT
+
+logger = get_logger(__name__)
+
+STAGES = ("fetch", "model", "render", "assemble", "send")
+
+
+class RunFolder:
+    """Artifacts and completed stages of one report run under ``root / name``.
+
+    A stage writes its artifacts into the folder and then calls ``complete``,
+    so a ``.done`` marker only exists for stages whose artifacts are whole. A
+    fresh run clears the folder; a resumed run keeps it and skips the stages
+    already done.
+    """
+
+    def __init__(self, root: Path = RUNS_ROOT, name: str = "run", resume: bool = False):
+        self.dir = Path(root) / name
+        if not resume and self.dir.exists():
+            shutil.rmtree(self.dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if resume:
+            logger.info(
+                "Resuming %s at the %s stage", self.dir, self.next_stage() or "end"
+            )
+
+    def path(self, name: str) -> Path:
+        return self.dir / name
+
+    def _marker(self, stage: str) -> Path:
+        if stage not in STAGES:
+            raise ValueError(f"stage must be one of {STAGES}")
+        return self.dir / f"{stage}.done"
+
+    def done(self, stage: str) -> bool:
+        return self._marker(stage).exists()
+
+    def complete(self, stage: str):
+        self._marker(stage).write_text(time.strftime("%Y-%m-%d %H:%M:%S"))
+        logger.info("Stage %s of %s complete", stage, self.dir.name)
+
+    def next_stage(self) -> Optional[str]:
+        """The first stage not done yet, or None once the run has finished."""
+        return next((stage for stage in STAGES if not self.done(stage)), None)
+
+    def save(self, name: str, value):
+        with self.path(name).open("wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, name: str):
+        with self.path(name).open("rb") as f:
+            return pickle.load(f)
+
+    def prune(self, keep_days: int = RUNS_KEEP_DAYS):
+        """Delete the other run folders beside this one that have not completed
+        a stage in ``keep_days`` days."""
+        cutoff = time.time() - keep_days * 24 * 3600
+        for folder in self.dir.parent.iterdir():
+            if folder == self.dir or not folder.is_dir():
+                continue
+            if folder.stat().st_mtime < cutoff:
+                shutil.rmtree(folder)
+                logger.info("Removed run folder %s", folder)
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Run-level location x tag x minute array of the historian data a report reads"""
+from __future__ import annotations
+
+import pickle
+import warnings
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_tools.utilities.alter_table import get_location_data
+from reports.config import get_logger
+from reports.settings import FETCH_TIMEOUT, FETCH_WORKERS
+from reports.utilities.fetch_pool import FetchRequest, freeze, prefetch
+
+logger = get_logger(__name__)
+
+REDUCTIONS = {
+    "mean": np.nanmean,
+    "sum": np.nansum,
+    "min": np.nanmin,
+    "max": np.nanmax,
+}
+
+
+class DayCube:
+    """Every summed tag of a run in one ``(location, tag, minute)`` float array.
+
+    ``valid`` marks the minutes the historian returned a value for, per tag, so
+    a request is served the rows where any of its own tags has a value, as if
+    it had been fetched alone. That relies on the historian returning every
+    minute any of a request's tags has, with ``NaN`` for the others. Requests
+    for tags held in the cube are answered from it through the
+    ``get_location_data`` signature; anything else (unsummed tags, tags or
+    windows outside the cube) goes to ``fetch``.
+    """
+
+    def __init__(
+        self,
+        minutes: pd.DatetimeIndex,
+        values: np.ndarray,
+        valid: np.ndarray,
+        locations: Dict[Tuple[str, str], int],
+        slots: Dict[Tuple[str, str], Dict],
+        fetch=get_location_data,
+    ):
+        self.minutes = minutes
+        self.values = values
+        self.valid = valid
+        self.locations = locations
+        self.slots = slots
+        self.fetch = fetch
+        self.stats = Counter()
+        self.values.setflags(write=False)
+        self.valid.setflags(write=False)
+
+    @classmethod
+    def build(
+        cls,
+        requests: Iterable[FetchRequest],
+        fetch=get_location_data,
+        max_workers: int = FETCH_WORKERS,
+        timeout: float = FETCH_TIMEOUT,
+    ) -> "DayCube":
+        """Fetch the tags of ``requests`` once per location over their joint window.
+
+        Locations whose data is not numeric or not on whole minutes are left
+        out and keep going to ``fetch``.
+        """
+        requests = [request for request in requests if request.sum_values]
+        start = min(request.start_date for request in requests)
+        end = max(request.end_date for request in requests)
+        minutes = pd.date_range(start, end, freq="min")
+
+        location_tags = {}
+        for request in requests:
+            tags = location_tags.setdefault((request.location, request.trucked), {})
+            for tag in request.tags:
+                tags.setdefault(freeze(tag), tag)
+        cube_requests = {
+            key: FetchRequest(
+                key[0],
+                list(tags.values()),
+                [f"tag_{slot}" for slot in range(len(tags))],
+                start,
+                end,
+                key[1],
+            )
+            for key, tags in location_tags.items()
+        }
+        fetched = prefetch(cube_requests.values(), fetch, max_workers, timeout)
+
+        width = max((len(tags) for tags in location_tags.values()), default=0)
+        values = np.full((len(cube_requests), width, len(minutes)), np.nan)
+        valid = np.zeros(values.shape, dtype=bool)
+        locations, slots = {}, {}
+        for key, request in cube_requests.items():
+            data = fetched.results.get(request.key())
+            if data is None or data.shape[1] != len(request.tags):
+                continue
+            if not data.dtypes.map(pd.api.types.is_numeric_dtype).all():
+                continue
+            positions = minutes.get_indexer(data.index)
+            if (positions < 0).any():
+                continue
+            idx = len(locations)
+            block = data.to_numpy(float).T
+            values[idx][: len(request.tags), positions] = block
+            valid[idx][: len(request.tags), positions] = ~np.isnan(block)
+            locations[key] = idx
+            slots[key] = {tag: slot for slot, tag in enumerate(location_tags[key])}
+
+        logger.info(
+            "Day cube: %s of %s locations, %s tag slots, %s minutes",
+            len(locations),
+            len(cube_requests),
+            width,
+            len(minutes),
+        )
+        count = len(locations)
+        return cls(
+            minutes, values[:count], valid[:count], locations, slots, fetch=fetch
+        )
+
+    def save(self, folder: Path):
+        """Write the arrays and their index to ``folder`` for ``load``."""
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        np.save(folder / "values.npy", self.values)
+        np.save(folder / "valid.npy", self.valid)
+        with (folder / "index.pickle").open("wb") as f:
+            pickle.dump((self.minutes, self.locations, self.slots), f)
+
+    @classmethod
+    def load(cls, folder: Path, fetch=get_location_data) -> "DayCube":
+        """A cube written by ``save``; its arrays are memory mapped read-only."""
+        folder = Path(folder)
+        with (folder / "index.pickle").open("rb") as f:
+            minutes, locations, slots = pickle.load(f)
+        return cls(
+            minutes,
+            np.load(folder / "values.npy", mmap_mode="r"),
+            np.load(folder / "valid.npy", mmap_mode="r"),
+            locations,
+            slots,
+            fetch=fetch,
+        )
+
+    def _span(self, start_date, end_date):
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        if start < self.minutes[0] or end > self.minutes[-1]:
+            return None
+        lower = self.minutes.searchsorted(start, side="left")
+        upper = self.minutes.searchsorted(end, side="right")
+        return slice(lower, upper)
+
+    def _position(self, location, tag, trucked):
+        key = (location, trucked)
+        slot = self.slots.get(key, {}).get(freeze(tag))
+        if slot is None:
+            return None
+        return self.locations[key], slot
+
+    def get_location_data(
+        self, location, tags, cols, start_date, end_date, trucked, sum_values=True
+    ):
+        span = self._span(start_date, end_date)
+        positions = [self._position(location, tag, trucked) for tag in tags]
+        if not sum_values or span is None or None in positions:
+            self.stats["fetched"] += 1
+            return self.fetch(
+                location,
+                tags,
+                cols,
+                start_date,
+                end_date,
+                trucked,
+                sum_values=sum_values,
+            )
+        idx = positions[0][0]
+        slots = [slot for _, slot in positions]
+        rows = self.valid[idx, slots, span].any(axis=0)
+        self.stats["served"] += 1
+        return pd.DataFrame(
+            self.values[idx, slots, span].T[rows],
+            index=self.minutes[span][rows],
+            columns=cols,
+        )
+
+    def view(self, location, tag, trucked, start_date, end_date):
+        """Read-only minute values and validity of one tag, without copying."""
+        span = self._span(start_date, end_date)
+        position = self._position(location, tag, trucked)
+        if span is None or position is None:
+            raise KeyError(f"{location} {tag} is not in the day cube")
+        idx, slot = position
+        return (
+            self.minutes[span],
+            self.values[idx, slot, span],
+            self.valid[idx, slot, span],
+        )
+
+    def reduce(self, series, start_date, end_date, how: str = "mean") -> pd.Series:
+        """One value per ``(location, tag, trucked)`` in ``series`` from a single
+        reduction over the window; ``NaN`` for series not in the cube."""
+        series = list(series)
+        span = self._span(start_date, end_date)
+        result = pd.Series(np.nan, index=[location for location, _, _ in series])
+        positions = [self._position(*item) for item in series]
+        found = [i for i, position in enumerate(positions) if position is not None]
+        if span is None or not found:
+            return result
+        idx = np.array([positions[i][0] for i in found])
+        slots = np.array([positions[i][1] for i in found])
+        block = np.where(
+            self.valid[idx, slots, span], self.values[idx, slots, span], np.nan
+        )
+        with warnings.catch_warnings():
+            # Series without a valid minute in the window reduce to NaN.
+            warnings.simplefilter("ignore", RuntimeWarning)
+            result.iloc[found] = REDUCTIONS[how](block, axis=1)
+        return result
+
+    def report(self):
+        logger.info(
+            "Day cube: %s requests served, %s fetched",
+            self.stats["served"],
+            self.stats["fetched"],
+        )
+        return dict(self.stats)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Derived columns computed once per fetched location window and shared by models"""
+from __future__ import annotations
+
+import threading
+
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Set, Tuple
+
+import pandas as pd
+
+from data_tools.utilities.alter_table import (
+    calculate_cumulative_flows,
+    calculate_cumulative_tank_volumes,
+    product_calculations,
+)
+from reports.config import get_logger
+from reports.utilities.fetch_pool import FetchRequest, fetch_request, freeze
+from reports.utilities.instrumentation import span
+
+logger = get_logger(__name__)
+
+
+class Derivation(NamedTuple):
+    """``columns`` set from ``compute(data, *args)``, which reads ``depends``."""
+
+    columns: Tuple[str, ...]
+    depends: Tuple[str, ...]
+    compute: Callable
+    args: Tuple[Any, ...] = ()
+
+
+def _cumulative_flow(data, source, freq):
+    return calculate_cumulative_flows(data[source], freq)
+
+
+def _cumulative_tank(data, source, freq):
+    return calculate_cumulative_tank_volumes(data[source], freq)
+
+
+def cumulative_flow(column: str, source: str, freq: float) -> Derivation:
+    return Derivation((column,), (source,), _cumulative_flow, (source, freq))
+
+
+def cumulative_tank(column: str, source: str, freq: float = 1) -> Derivation:
+    return Derivation((column,), (source,), _cumulative_tank, (source, freq))
+
+
+PRODUCT = Derivation(
+    ("product_per_M", "cum_product"),
+    ("inlet_flowrate", "product_flowrate", "product_tank_volume"),
+    product_calculations,
+)
+
+
+class _Entry(NamedTuple):
+    window: Tuple[Any, Any]
+    raw: List[str]
+    data: pd.DataFrame
+    derived: Set[Derivation]
+
+
+class DerivedColumns:
+    """Fetched frames with their derived columns, one per location request.
+
+    A request for the same location, tags and columns over the same window
+    gets the columns already derived for it. A different window replaces the
+    frame and everything derived from it. Setting a column again with a
+    different derivation drops the derivations that read it.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Any, _Entry] = {}
+        self._locks: Dict[Any, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self.dependencies: Dict[str, Tuple[str, ...]] = {}
+        self.stats = Counter()
+
+    def _lock(self, series) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(series, threading.Lock())
+
+    def _drop(self, entry: _Entry, columns):
+        """Forget derivations that set or read ``columns``, and their dependants."""
+        stale = {
+            derivation
+            for derivation in entry.derived
+            if set(columns) & set(derivation.columns + derivation.depends)
+        }
+        entry.derived.difference_update(stale)
+        for derivation in stale:
+            self._drop(entry, derivation.columns)
+
+    def _derive(self, entry: _Entry, derivations) -> pd.DataFrame:
+        for derivation in derivations:
+            if derivation in entry.derived:
+                self.stats["shared"] += 1
+                continue
+            self._drop(entry, derivation.columns)
+            with span("derive " + ", ".join(derivation.columns)) as derive_span:
+                values = derivation.compute(entry.data, *derivation.args)
+                derive_span.add_rows(len(entry.data))
+            if len(derivation.columns) == 1:
+                values = (values,)
+            for column, value in zip(derivation.columns, values):
+                entry.data[column] = value
+                self.dependencies[column] = derivation.depends
+            entry.derived.add(derivation)
+            self.stats["computed"] += 1
+        columns = entry.raw + [
+            column
+            for derivation in derivations
+            for column in derivation.columns
+            if column not in entry.raw
+        ]
+        return entry.data[list(dict.fromkeys(columns))].copy()
+
+    def frame(self, fetch, request: FetchRequest, derivations) -> pd.DataFrame:
+        """The fetched columns of ``request`` plus those of ``derivations``.
+
+        Derivations are applied in order, so one may read columns set by an
+        earlier one. Each location series has its own lock, and none is held
+        while fetching.
+        """
+        series = freeze(
+            (
+                request.location,
+                request.tags,
+                request.cols,
+                request.trucked,
+                request.sum_values,
+            )
+        )
+        window = (request.start_date, request.end_date)
+        lock = self._lock(series)
+        data = None
+        while True:
+            with lock:
+                entry = self._entries.get(series)
+                if entry is not None and entry.window == window:
+                    return self._derive(entry, derivations)
+                if data is not None:
+                    if entry is not None:
+                        self.stats["invalidated"] += 1
+                    entry = _Entry(window, list(data.columns), data, set())
+                    self._entries[series] = entry
+                    return self._derive(entry, derivations)
+            # Another thread may store this window while it is fetched here.
+            data = fetch_request(fetch, request)
+
+    def report(self):
+        logger.info(
+            "Derived columns: %s computed, %s shared, %s invalidated",
+            self.stats["computed"],
+            self.stats["shared"],
+            self.stats["invalidated"],
+        )
+        return dict(self.stats)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Concurrent prefetch of the historian requests a model is about to make"""
+from __future__ import annotations
+
+import datetime as dt
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, NamedTuple
+
+from data_tools.utilities.alter_table import get_location_data
+from reports.config import get_logger
+from reports.settings import FETCH_TIMEOUT, FETCH_WORKERS
+from reports.utilities.isolation import DeadlineExceeded, call_with_deadline
+from reports.utilities.log_helper import log_call
+
+logger = get_logger(__name__)
+
+
+def freeze(value):
+    """Turn a tag, or a nested list of tags, into something hashable."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class FetchRequest(NamedTuple):
+    location: str
+    tags: List[Any]
+    cols: List[str]
+    start_date: dt.datetime
+    end_date: dt.datetime
+    trucked: str
+    sum_values: bool = True
+
+    def key(self):
+        return freeze(tuple(self))
+
+
+@log_call(logger=logger, timing=True)
+def fetch_request(fetch, request: FetchRequest):
+    """Run a single request through a ``get_location_data`` style callable."""
+    return fetch(
+        request.location,
+        request.tags,
+        request.cols,
+        request.start_date,
+        request.end_date,
+        request.trucked,
+        sum_values=request.sum_values,
+    )
+
+
+class PrefetchedData:
+    """Results of a prefetch, served through the ``get_location_data`` signature.
+
+    Requests that were not part of the prefetch go straight to ``fetch``. A
+    request that failed or timed out re-raises its error when it is asked for,
+    just as the direct call would have.
+    """
+
+    def __init__(self, fetch=get_location_data):
+        self.fetch = fetch
+        self.results = {}
+        self.errors = {}
+
+    def get_location_data(
+        self, location, tags, cols, start_date, end_date, trucked, sum_values=True
+    ):
+        request = FetchRequest(
+            location, tags, cols, start_date, end_date, trucked, sum_values
+        )
+        key = request.key()
+        if key in self.errors:
+            raise self.errors[key]
+        if key in self.results:
+            return self.results[key].copy()
+        return fetch_request(self.fetch, request)
+
+
+def prefetch(
+    requests,
+    fetch=get_location_data,
+    max_workers: int = FETCH_WORKERS,
+    timeout: float = FETCH_TIMEOUT,
+):
+    """Issue ``requests`` through a bounded thread pool ahead of modelling.
+
+    Each request may take ``timeout`` seconds once it starts; one that runs
+    over raises ``TimeoutError`` when it is asked for. Its historian call is
+    left on a daemon thread, so it holds up neither the pool nor the
+    interpreter's exit.
+    """
+    prefetched = PrefetchedData(fetch)
+    unique = {}
+    for request in requests:
+        unique.setdefault(request.key(), request)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            key: executor.submit(
+                call_with_deadline, fetch_request, timeout, fetch, request
+            )
+            for key, request in unique.items()
+        }
+        for key, future in futures.items():
+            try:
+                prefetched.results[key] = future.result()
+            except DeadlineExceeded:
+                location = unique[key].location
+                logger.warning("Fetch for %s timed out after %ss", location, timeout)
+                prefetched.errors[key] = TimeoutError(
+                    f"Fetch for {location} timed out after {timeout}s"
+                )
+            except Exception as err:
+                prefetched.errors[key] = err
+    logger.info(
+        "Prefetched %s requests (%s failed)", len(unique), len(prefetched.errors)
+    )
+    return prefetched
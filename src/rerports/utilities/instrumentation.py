@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Hierarchical timing and memory spans for report runs"""
+from __future__ import annotations
+
+import functools
+import json
+import sys
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import List, Optional
+
+from reports import config
+from reports.config import get_logger
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - memory is not recorded without it
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+logger = get_logger(__name__)
+
+# Seconds between the resident memory samples taken while spans are open.
+RSS_INTERVAL = 0.01
+
+
+def rss() -> Optional[int]:
+    """Resident memory of the process in bytes, if psutil is installed."""
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def max_rss() -> Optional[int]:
+    """Highest resident memory of the process so far in bytes, where known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Span:
+    """Wall time, CPU time, peak resident memory and rows of one stage.
+
+    With ``process_cpu`` the CPU time is the whole process's, so work the stage
+    hands to other threads counts; otherwise it is the opening thread's. The
+    peak is the highest of the samples taken while the stage is open, or the
+    process's own high-water mark if the stage raised it.
+    """
+
+    __slots__ = (
+        "name",
+        "children",
+        "wall",
+        "cpu",
+        "rss_peak",
+        "rows",
+        "_cpu_clock",
+        "_wall_start",
+        "_cpu_start",
+        "_max_rss_start",
+    )
+
+    def __init__(self, name: str, process_cpu: bool = False):
+        self.name = name
+        self.children: List[Span] = []
+        self.wall = self.cpu = 0.0
+        self.rss_peak = None
+        self.rows = None
+        self._cpu_clock = time.process_time if process_cpu else time.thread_time
+        self._wall_start = self._cpu_start = self._max_rss_start = None
+
+    def start(self):
+        self._wall_start = time.perf_counter()
+        self._cpu_start = self._cpu_clock()
+        self.rss_peak = rss()
+        self._max_rss_start = max_rss()
+
+    def sample(self, current: Optional[int]):
+        if current is not None and self.rss_peak is not None:
+            self.rss_peak = max(self.rss_peak, current)
+
+    def stop(self):
+        self.wall = time.perf_counter() - self._wall_start
+        self.cpu = self._cpu_clock() - self._cpu_start
+        self.sample(rss())
+        highest = max_rss()
+        if highest is not None and highest > self._max_rss_start:
+            self.sample(highest)
+
+    def add_rows(self, rows: int):
+        self.rows = (self.rows or 0) + int(rows)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "wall": round(self.wall, 6),
+            "cpu": round(self.cpu, 6),
+            "rss_peak": self.rss_peak,
+            "rows": self.rows,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def walk(self, depth=0):
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+class Instrumentation:
+    """Tree of spans for one run.
+
+    Spans nest within the thread that opens them; spans opened on worker
+    threads hang off the run itself unless the work was wrapped with
+    ``carry_spans``. The run and its top-level spans count the CPU time of
+    the whole process, nested spans that of their thread. While any span is
+    open a daemon thread samples resident memory every ``RSS_INTERVAL``
+    seconds into the open spans' peaks. Each of ``listeners`` has its
+    ``enter(span, depth)`` and ``exit(span, depth)`` called around every span.
+    """
+
+    def __init__(self, name: str = "run"):
+        self.root = Span(name, process_cpu=True)
+        self.root.start()
+        self.listeners = []
+        self._local = threading.local()
+        self._guard = threading.Lock()
+        self._open: List[Span] = []
+        self._sampler = None
+
+    def _sample_rss(self):
+        while True:
+            time.sleep(RSS_INTERVAL)
+            current = rss()
+            with self._guard:
+                if not self._open:
+                    self._sampler = None
+                    return
+                self.root.sample(current)
+                for span in self._open:
+                    span.sample(current)
+
+    def _watch(self, span: Span):
+        with self._guard:
+            self._open.append(span)
+            if self._sampler is None and span.rss_peak is not None:
+                self._sampler = threading.Thread(
+                    target=self._sample_rss, name="rss", daemon=True
+                )
+                self._sampler.start()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = [self.root]
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str):
+        stack = self._stack()
+        depth = len(stack)
+        span = Span(name, process_cpu=depth == 1)
+        with self._guard:
+            stack[-1].children.append(span)
+        stack.append(span)
+        for listener in self.listeners:
+            listener.enter(span, depth)
+        span.start()
+        self._watch(span)
+        try:
+            yield span
+        finally:
+            with self._guard:
+                self._open.remove(span)
+            span.stop()
+            for listener in self.listeners:
+                listener.exit(span, depth)
+            stack.pop()
+
+    def carry(self, work):
+        stack = list(self._stack())
+
+        @functools.wraps(work)
+        def carried(*args, **kwargs):
+            self._local.stack = list(stack)
+            return work(*args, **kwargs)
+
+        return carried
+
+    def finish(self):
+        self.root.stop()
+        for _, span in self.root.walk():
+            self.root.sample(span.rss_peak)
+        return self.root
+
+    def table(self) -> str:
+        lines = [
+            f"{'stage':<48} {'wall s':>9} {'cpu s':>9} {'peak MiB':>9} {'rows':>9}"
+        ]
+        for depth, span in self.root.walk():
+            rss = "" if span.rss_peak is None else f"{span.rss_peak / 2**20:.1f}"
+            rows = "" if span.rows is None else str(span.rows)
+            name = ("  " * depth + span.name)[:48]
+            lines.append(
+                f"{name:<48} {span.wall:>9.2f} {span.cpu:>9.2f} {rss:>9} {rows:>9}"
+            )
+        return "\n".join(lines)
+
+    def write(self, directory: Path, stem: str):
+        """Write ``stem.json`` and ``stem.txt`` under ``directory``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        json_file = directory / f"{stem}.json"
+        table_file = directory / f"{stem}.txt"
+        json_file.write_text(json.dumps(self.root.to_dict(), indent=2))
+        table_file.write_text(self.table() + "\n")
+        return json_file, table_file
+
+
+# Handed out by ``span`` while instrumentation is off.
+_UNUSED = Span("unused")
+
+
+def span(name: str):
+    """A span under the active instrumentation, or nothing if it is off."""
+    instrumentation = config.get_instrumentation()
+    if instrumentation is None:
+        return nullcontext(_UNUSED)
+    return instrumentation.span(name)
+
+
+def carry_spans(work):
+    """``work``, opening its spans under the current span on whichever thread
+    it runs."""
+    instrumentation = config.get_instrumentation()
+    if instrumentation is None:
+        return work
+    return instrumentation.carry(work)
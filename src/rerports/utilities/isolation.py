@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Deadlines and exception boundaries around each location's work in a run"""
+from __future__ import annotations
+
+import datetime as dt
+import html
+import threading
+
+from concurrent.futures import Future, TimeoutError
+from typing import List, NamedTuple, Optional
+
+from reports.config import get_logger
+from reports.settings import LOCATION_TIMEOUT
+from reports.templates.figure_spec import FigureSpec
+from reports.utilities.instrumentation import carry_spans
+from reports.utilities.registry import get_registry
+
+logger = get_logger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A location's work did not finish within its deadline."""
+
+
+def call_with_deadline(work, timeout: Optional[float], *args, **kwargs):
+    """``work(*args, **kwargs)``, raising ``DeadlineExceeded`` after ``timeout`` s.
+
+    The call runs on a daemon thread so a stuck historian request cannot hold
+    up the rest of the run, or its exit; a call that misses its deadline is
+    left to finish in the background and its result is dropped. With no
+    ``timeout`` it runs inline.
+    """
+    if timeout is None:
+        return work(*args, **kwargs)
+    future = Future()
+    work = carry_spans(work)
+
+    def target():
+        try:
+            future.set_result(work(*args, **kwargs))
+        except BaseException as err:
+            future.set_exception(err)
+
+    threading.Thread(target=target, name="deadline", daemon=True).start()
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        if future.done():
+            raise
+        raise DeadlineExceeded(f"no result after {timeout}s") from None
+
+
+def run_deadline(
+    deadline: Optional[dt.datetime], timeout: Optional[float]
+) -> Optional[dt.datetime]:
+    """``deadline``, or None if it had already passed when the run started.
+
+    A late run, or one resumed after the deadline, still gets every location
+    its ``timeout`` rather than "No Data" pages throughout.
+    """
+    if deadline is not None and deadline <= dt.datetime.now():
+        logger.warning(
+            "Delivery deadline %s passed before the run started, "
+            "giving each location %ss instead",
+            f"{deadline:%H:%M}",
+            timeout,
+        )
+        return None
+    return deadline
+
+
+def plan_requests(build, locations, *args) -> list:
+    """``build(location, *args)`` of each of ``locations`` that has the tags.
+
+    A location with a missing tag is left out of the fetch plan; its own
+    model work raises the same ``KeyError`` inside its boundary and is
+    degraded there.
+    """
+    requests = []
+    for location in locations:
+        try:
+            requests.append(build(location, *args))
+        except KeyError as err:
+            logger.info("%s left out of the fetch plan: %r", location, err)
+    return requests
+
+
+class LocationFailure(NamedTuple):
+    stage: str
+    location: str
+    error: str
+
+
+def display_name(location) -> str:
+    try:
+        return get_registry()[location].get("name")
+    except KeyError:
+        return str(location)
+
+
+class DegradedLocations:
+    """Locations left out of, or stood in for in, a run's figures.
+
+    ``run`` gives every location its own ``timeout`` and exception boundary,
+    so one missing tag, empty frame or slow historian response costs that
+    location's pages rather than the whole report. Once ``deadline`` has
+    passed the remaining locations are not run at all.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = LOCATION_TIMEOUT,
+        deadline: Optional[dt.datetime] = None,
+    ):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.failures: List[LocationFailure] = []
+
+    def add(self, stage: str, location, error):
+        failure = LocationFailure(stage, str(location), repr(error))
+        logger.warning("%s degraded in %s: %s", failure.location, stage, failure.error)
+        self.failures.append(failure)
+        return failure
+
+    def _time_left(self) -> Optional[float]:
+        if self.deadline is None:
+            return self.timeout
+        left = (self.deadline - dt.datetime.now()).total_seconds()
+        if left <= 0:
+            raise DeadlineExceeded(f"past the {self.deadline:%H:%M} delivery deadline")
+        return left if self.timeout is None else min(self.timeout, left)
+
+    def run(self, stage: str, location, work, *args, **kwargs):
+        """``work``'s result, or None once the failure has been recorded."""
+        try:
+            return call_with_deadline(work, self._time_left(), *args, **kwargs)
+        except Exception as err:
+            self.add(stage, location, err)
+            return None
+
+    def placeholder(self, location, title: str) -> FigureSpec:
+        """A "No Data" page in place of ``location``'s ``title`` page."""
+        errors = [
+            failure.error
+            for failure in self.failures
+            if failure.location == str(location)
+        ]
+        return FigureSpec(
+            "no_data_plot",
+            (f"{display_name(location)} {title}", errors[-1] if errors else None),
+        )
+
+    def __bool__(self):
+        return bool(self.failures)
+
+    def summary(self) -> str:
+        """HTML list of the degraded locations for the report email."""
+        items = "".join(
+            f"<li>{html.escape(display_name(failure.location))} ({failure.stage}): "
+            f"{html.escape(failure.error)}</li>"
+            for failure in self.failures
+        )
+        return f"<p>Shown without full data:</p><ul>{items}</ul>"
+
+    def report(self):
+        logger.info("Degraded locations: %s", len(self.failures))
+        return list(self.failures)
@@ -1,42 +1,103 @@
 """Wrappers for better log handling"""
 from functools import wraps
 import inspect
+import logging
+import reprlib
+import time
+import tracemalloc
 
+# Longest rendering of a call's arguments, in characters.
+ARGS_LIMIT = 2000
 
-def stringify_object(obj):
-    if isinstance(obj, dict):
+_repr = reprlib.Repr()
+_repr.maxlevel = 3
+_repr.maxdict = 10
+_repr.maxlist = _repr.maxtuple = _repr.maxset = 10
+_repr.maxstring = 200
+_repr.maxother = 200
+
+
+class CallArgs:
+    """Arguments of a call, rendered only when a handler formats the record."""
+
+    __slots__ = ("sig", "args", "kwargs", "limit")
+
+    def __init__(self, sig, args, kwargs, limit=ARGS_LIMIT):
+        self.sig = sig
+        self.args = args
+        self.kwargs = kwargs
+        self.limit = limit
+
+    def __str__(self):
         try:
-            return {stringify_object(k): stringify_object(v) for k, v in obj.items()}
-        except Exception:
-            return {
-                repr(stringify_object(k)): stringify_object(v) for k, v in obj.items()
-            }
-    elif isinstance(obj, (tuple, set, list)):
-        return [stringify_object(item) for item in obj]
-    elif isinstance(obj, (str, int, float)):
-        return obj
-    else:
-        return repr(obj)
-
-
-def log_call(logger):
+            arguments = self.sig.bind(*self.args, **self.kwargs).arguments
+        except TypeError:
+            arguments = {"args": self.args, "kwargs": self.kwargs}
+        text = "{%s}" % ", ".join(
+            f"{name!r}: {_repr.repr(value)}" for name, value in arguments.items()
+        )
+        if len(text) > self.limit:
+            return text[: self.limit] + f"... ({len(text)} chars)"
+        return text
+
+
+def log_call(logger, timing=False, memory=False, level=logging.INFO):
+    """Log calls to the wrapped function at ``level``.
+
+    Nothing is formatted unless ``logger`` is enabled for ``level``. With
+    ``timing`` the wall time and with ``memory`` the peak traced memory of each
+    call is logged with its success.
+    """
+
     def wrapper(func):
         func_name = f"{func.__module__}.{func.__name__}"
         sig = inspect.signature(func)
 
         @wraps(func)
         def wrapped(*args, **kwargs):
-            string_args = {
-                k: stringify_object(v)
-                for k, v in sig.bind(*args, **kwargs).arguments.items()
-            }
-            logger.info("\n--> Calling '%s' with args:\n %s", func_name, string_args)
+            if not logger.isEnabledFor(level):
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    if logger.isEnabledFor(logging.ERROR):
+                        logger.exception(
+                            "Exception in '%s' args\n %s",
+                            func_name,
+                            CallArgs(sig, args, kwargs),
+                        )
+                    raise
+
+            call_args = CallArgs(sig, args, kwargs)
+            logger.log(
+                level, "\n--> Calling '%s' with args:\n %s", func_name, call_args
+            )
+            tracing = memory and not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            start = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
             except Exception as err:
-                logger.exception("Exception in '%s' args\n %s", func_name, string_args)
+                logger.exception("Exception in '%s' args\n %s", func_name, call_args)
                 raise err
-            logger.info("\n--> Call to '%s' successful\n", func_name)
+            finally:
+                elapsed = time.perf_counter() - start
+                if memory:
+                    # Nested calls report the peak of the outermost traced call.
+                    peak = tracemalloc.get_traced_memory()[1]
+                if tracing:
+                    tracemalloc.stop()
+            fields = []
+            if timing:
+                fields.append(f"wall={elapsed:.3f}s")
+            if memory:
+                fields.append(f"peak={peak / 2**20:.1f}MiB")
+            logger.log(
+                level,
+                "\n--> Call to '%s' successful%s\n",
+                func_name,
+                "".join(f" {field}" for field in fields),
+            )
             return result
 
         return wrapped
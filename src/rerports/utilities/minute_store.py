@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""On-disk store of historian minute data with incremental fetching"""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_tools.utilities.alter_table import get_location_data
+from reports.config import get_logger
+from reports.settings import STORE_ROOT
+
+logger = get_logger(__name__)
+
+ONE_DAY = pd.Timedelta(days=1)
+LAST_MINUTE = pd.Timedelta(days=1, minutes=-1)
+
+
+def _save(path: Path, array: np.ndarray):
+    """Write ``array`` next to ``path`` first so readers never see half a file."""
+    partial = path.with_name(path.name + ".partial")
+    with partial.open("wb") as f:
+        np.save(f, array)
+    os.replace(partial, path)
+
+
+class MinuteStore:
+    """Keep complete days of every request on disk as memory-mapped arrays.
+
+    Each request signature (tags, columns, trucked, sum_values) of a location
+    gets a folder holding one ``.npy`` block of minute values per day and a
+    ``.valid.npy`` mask of the minutes the historian returned. Only past days
+    the historian returned every minute of are kept, so a day it backfills
+    later is fetched again. Days that are not stored yet, and the current
+    day, are fetched from the historian.
+    """
+
+    def __init__(self, root: Path = STORE_ROOT, fetch=get_location_data):
+        self.root = Path(root)
+        self.fetch = fetch
+
+    def _folder(self, location, tags, cols, trucked, sum_values):
+        signature = json.dumps([tags, cols, trucked, sum_values], default=str)
+        digest = hashlib.sha1(signature.encode("utf8")).hexdigest()[:16]
+        return self.root / str(location) / digest
+
+    @staticmethod
+    def _files(folder: Path, day: pd.Timestamp):
+        name = day.strftime("%Y-%m-%d")
+        return folder / f"{name}.npy", folder / f"{name}.valid.npy"
+
+    def _read_day(self, folder: Path, day: pd.Timestamp, columns):
+        values_file, valid_file = self._files(folder, day)
+        values = np.load(values_file, mmap_mode="r")
+        valid = np.load(valid_file, mmap_mode="r")
+        index = pd.date_range(day, periods=len(valid), freq="min")
+        return pd.DataFrame(values, index=index, columns=columns, copy=False)[valid]
+
+    def _write_day(self, folder: Path, day: pd.Timestamp, data: pd.DataFrame):
+        """Store ``day`` if the historian returned every minute of it."""
+        minutes = pd.date_range(day, day + LAST_MINUTE, freq="min")
+        valid = minutes.isin(data.index)
+        if not valid.all():
+            return
+        values = data.reindex(minutes).to_numpy(dtype=float)
+        values_file, valid_file = self._files(folder, day)
+        _save(values_file, values)
+        _save(valid_file, valid)
+
+    def _columns(self, folder: Path, data: pd.DataFrame = None):
+        """Column names stored for ``folder``; a changed layout clears the folder."""
+        columns_file = folder / "columns.json"
+        stored = json.loads(columns_file.read_text()) if columns_file.exists() else None
+        if data is None:
+            return stored
+        columns = [str(col) for col in data.columns]
+        if stored != columns:
+            folder.mkdir(parents=True, exist_ok=True)
+            for old in folder.glob("*.npy"):
+                old.unlink()
+            columns_file.write_text(json.dumps(columns))
+        return columns
+
+    def get_location_data(
+        self, location, tags, cols, start_date, end_date, trucked, sum_values=True
+    ):
+        folder = self._folder(location, tags, cols, trucked, sum_values)
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        today = pd.Timestamp(dt.datetime.today()).normalize()
+        columns = self._columns(folder)
+
+        def stored(day):
+            valid_file = self._files(folder, day)[1]
+            if columns is None or not valid_file.exists():
+                return False
+            return bool(np.load(valid_file, mmap_mode="r").all())
+
+        pieces = []
+        missing = []
+        for day in pd.date_range(start.normalize(), end.normalize(), freq="D"):
+            if day < today and stored(day):
+                pieces.append((day, None))
+            else:
+                missing.append(day)
+
+        # Fetch each run of consecutive missing days with a single request.
+        runs = []
+        for day in missing:
+            if runs and day - runs[-1][-1] == ONE_DAY:
+                runs[-1].append(day)
+            else:
+                runs.append([day])
+        relayout = False
+        for run in runs:
+            fetch_start = run[0] if run[0] < today else max(start, run[0])
+            fetch_end = run[-1] + LAST_MINUTE if run[-1] < today else end
+            data = self.fetch(
+                location,
+                tags,
+                cols,
+                fetch_start.to_pydatetime(),
+                fetch_end.to_pydatetime(),
+                trucked,
+                sum_values=sum_values,
+            )
+            numeric = data.dtypes.map(pd.api.types.is_numeric_dtype).all()
+            if numeric and not data.empty:
+                stored_columns = self._columns(folder, data)
+                relayout = relayout or columns not in (None, stored_columns)
+                columns = stored_columns
+                for day in run:
+                    if day < today:
+                        self._write_day(folder, day, data.loc[day : day + LAST_MINUTE])
+            pieces.append((run[0], data))
+
+        if relayout:
+            # The historian returned a new column layout, so stored days are gone.
+            return self.fetch(
+                location,
+                tags,
+                cols,
+                start_date,
+                end_date,
+                trucked,
+                sum_values=sum_values,
+            )
+        logger.info(
+            "Minute store %s: %s stored days, %s fetched",
+            location,
+            len(pieces) - len(runs),
+            len(missing),
+        )
+        frames = [
+            self._read_day(folder, day, columns) if data is None else data
+            for day, data in sorted(pieces, key=lambda piece: piece[0])
+        ]
+        return pd.concat(frames).loc[start:end].copy()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""cProfile and sampling profiles of a run, split by instrumentation stage"""
+from __future__ import annotations
+
+import cProfile
+import sys
+import threading
+import time
+
+from collections import Counter
+from pathlib import Path
+
+from reports.config import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_MODES = ("cprofile", "sampling")
+SAMPLE_INTERVAL = 0.005
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{Path(code.co_filename).stem}:{code.co_name}"
+
+
+class StageProfiler:
+    """Profile each top-level instrumentation span of a run.
+
+    ``cprofile`` writes one ``.pstats`` file per stage of the main thread.
+    cProfile only sees the thread it was enabled on, so the per-location model
+    work, the prefetch and the fetches that run on worker threads show up as
+    time spent waiting on futures; use it for the stages that stay on the main
+    thread. ``sampling`` samples the stacks of every thread each ``interval``
+    seconds and writes them, prefixed with the running stage, to
+    ``stacks.collapsed`` for flame graph tools; use it to profile the models.
+    """
+
+    def __init__(
+        self, out_dir: Path, mode: str = "cprofile", interval: float = SAMPLE_INTERVAL
+    ):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"profile mode must be one of {PROFILE_MODES}")
+        self.out_dir = Path(out_dir)
+        self.mode = mode
+        self.interval = interval
+        self.stage = "run"
+        self.files = []
+        self._stages = 0
+        self._profile = None
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def _top_level(self, depth):
+        return depth == 1 and threading.current_thread() is threading.main_thread()
+
+    def enter(self, span, depth):
+        if not self._top_level(depth):
+            return
+        self.stage = span.name
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def exit(self, span, depth):
+        if not self._top_level(depth):
+            return
+        if self._profile is not None:
+            self._profile.disable()
+            self._stages += 1
+            stats_file = self.out_dir / f"{self._stages:02d}_{span.name}.pstats"
+            self._profile.dump_stats(stats_file)
+            self.files.append(stats_file)
+            self._profile = None
+        self.stage = "run"
+
+    def _sample(self):
+        sampler = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stage = self.stage
+            for ident, frame in sys._current_frames().items():
+                if ident == sampler:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                self._stacks[";".join([stage] + stack[::-1])] += 1
+
+    def start(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        if self.mode == "sampling":
+            self._sampler = threading.Thread(
+                target=self._sample, name="stage-sampler", daemon=True
+            )
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            stacks_file = self.out_dir / "stacks.collapsed"
+            with stacks_file.open("w") as f:
+                for stack, count in sorted(self._stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            self.files.append(stacks_file)
+        logger.info("Profiles written to %s", self.out_dir)
+        return self.files
+
+
+def profile_dir(root: Path, name: str) -> Path:
+    return Path(root) / f"{name}_{time.strftime('%Y%m%d_%H%M%S')}"
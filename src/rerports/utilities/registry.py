@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Tag lookups of every location, built once and shared by the models"""
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Any, NamedTuple, Optional, Tuple
+
+CHEMICALS = ("a", "b", "c", "d", "e")
+FIELDS = (
+    "name",
+    "connection_type",
+    "designation",
+    "trucked",
+    "inlet_flowrate",
+    "discharge_flowrate",
+    "fuel",
+    "fuel_flowrate",
+    "product_flowrate",
+    "product_tank_volume",
+    "pipeline_pressure",
+    "inlet_names",
+) + tuple(
+    field
+    for chemical in CHEMICALS
+    for field in (f"chemical_{chemical}", f"chemical_{chemical}_volume")
+)
+_INDEX = {field: idx for idx, field in enumerate(FIELDS)}
+
+# Locations left out of the chemical consumption figures and tank export.
+NO_CONSUMPTION = ("Location_I",)
+
+# Stands in for a lookup that raised ``KeyError`` when the registry was built.
+MISSING = object()
+
+REGISTRY = None
+
+
+class LocationRecord(NamedTuple):
+    location: str
+    values: Tuple[Any, ...]
+
+    def get(self, field: str):
+        value = self.values[_INDEX[field]]
+        if value is MISSING:
+            raise KeyError(f"{self.location} has no {field} tag")
+        return value
+
+    def has(self, *fields: str) -> bool:
+        """Whether every one of ``fields`` has a tag at this location."""
+        values = (self.values[_INDEX[field]] for field in fields)
+        return all(value is not MISSING and value for value in values)
+
+
+def _lookup(tags, field, location):
+    accessor = getattr(tags, field, None)
+    if accessor is None:
+        return MISSING
+    try:
+        return accessor(location)
+    except KeyError:
+        return MISSING
+
+
+class Registry:
+    """Every location's tags and the location lists the models filter on.
+
+    ``locations`` keeps the order of the tag listing. ``production`` drops the
+    ``connection_1`` locations, ``consumption`` also drops ``NO_CONSUMPTION``,
+    ``full_flow`` has inlet, discharge and fuel tags and ``with_pressure`` has
+    pipeline pressures.
+    """
+
+    def __init__(self, records):
+        self.records = MappingProxyType({record.location: record for record in records})
+        self.locations = tuple(self.records)
+        self.production = tuple(
+            location
+            for location, record in self.records.items()
+            if record.get("connection_type") != "connection_1"
+        )
+        self.consumption = tuple(
+            location for location in self.production if location not in NO_CONSUMPTION
+        )
+        self.full_flow = tuple(
+            location
+            for location, record in self.records.items()
+            if record.has("inlet_flowrate", "discharge_flowrate", "fuel_flowrate")
+        )
+        self.with_pressure = tuple(
+            location
+            for location, record in self.records.items()
+            if record.has("pipeline_pressure")
+        )
+
+    @classmethod
+    def build(cls, listing, tags) -> Registry:
+        """Look up every field of every location of ``listing`` on ``tags``."""
+        return cls(
+            LocationRecord(
+                location,
+                tuple(_lookup(tags, field, location) for field in FIELDS),
+            )
+            for location, _ in listing
+        )
+
+    def __getitem__(self, location) -> LocationRecord:
+        return self.records[location]
+
+    def __iter__(self):
+        return iter(self.locations)
+
+    def __len__(self):
+        return len(self.locations)
+
+
+def get_registry() -> Registry:
+    """The registry of the site's tags, built on first use."""
+    global REGISTRY
+    if REGISTRY is None:
+        from data_tools.utilities.tags import TAGS, GetTags
+
+        REGISTRY = Registry.build(TAGS, GetTags())
+    return REGISTRY
+
+
+def set_registry(registry: Optional[Registry]):
+    """Use ``registry`` from now on, or rebuild on next use if ``None``."""
+    global REGISTRY
+    REGISTRY = registry
+
+
+def field(name: str):
+    """A ``location -> tag`` lookup of ``name`` that reads the shared registry."""
+
+    def lookup(location):
+        return get_registry()[location].get(name)
+
+    lookup.__name__ = name
+    return lookup
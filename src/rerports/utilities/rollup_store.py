@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""SQLite store of per-location daily production totals"""
+from __future__ import annotations
+
+import datetime as dt
+import sqlite3
+
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from reports.config import get_logger
+from reports.settings import ROLLUP_DB
+
+logger = get_logger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_production (
+    day TEXT NOT NULL,
+    location TEXT NOT NULL,
+    connection_type TEXT,
+    designation TEXT,
+    product_total REAL,
+    pumped REAL,
+    PRIMARY KEY (day, location)
+)
+"""
+
+TREND = """
+SELECT
+    day,
+    SUM(CASE WHEN connection_type = 'connection_1' THEN 0 ELSE product_total END),
+    SUM(CASE WHEN connection_type = 'connection_1' THEN product_total ELSE 0 END),
+    SUM(product_total)
+FROM daily_production
+WHERE day BETWEEN ? AND ?
+GROUP BY day
+ORDER BY day
+"""
+
+TREND_COLUMNS = ["location_type_a", "location_type_b", "total"]
+
+
+class LocationTotals:
+    """Product total and volume pumped of one location for one day."""
+
+    __slots__ = (
+        "location",
+        "name",
+        "connection_type",
+        "designation",
+        "product_total",
+        "pumped",
+    )
+
+    def __init__(
+        self, location, name, connection_type, designation, product_total, pumped
+    ):
+        self.location = location
+        self.name = name
+        self.connection_type = connection_type
+        self.designation = designation
+        self.product_total = product_total
+        self.pumped = pumped
+
+    def __repr__(self):
+        fields = ", ".join(f"{slot}={getattr(self, slot)!r}" for slot in self.__slots__)
+        return f"LocationTotals({fields})"
+
+
+def totals_frame(totals: Iterable[LocationTotals]) -> pd.DataFrame:
+    """One row per location, in the order given."""
+    totals = list(totals)
+    return pd.DataFrame(
+        {
+            slot: [getattr(total, slot) for total in totals]
+            for slot in LocationTotals.__slots__
+        }
+    )
+
+
+class RollupStore:
+    """Daily totals of every location, one row per day and location.
+
+    Rewriting a day replaces the rows of the locations written, so reruns and
+    backfills are safe. A location without totals, such as one that failed in
+    the run, is not written and keeps any row it already has.
+    """
+
+    def __init__(self, path: Path = ROLLUP_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def write(self, day: dt.date, totals: Iterable[LocationTotals]):
+        totals = list(totals)
+        rows = [
+            (
+                day.isoformat(),
+                str(total.location),
+                total.connection_type,
+                total.designation,
+                float(total.product_total),
+                float(total.pumped),
+            )
+            for total in totals
+            if not (pd.isna(total.product_total) or pd.isna(total.pumped))
+        ]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO daily_production VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        logger.info(
+            "Rollup: wrote %s locations for %s, skipped %s without totals",
+            len(rows),
+            day,
+            len(totals) - len(rows),
+        )
+        return len(rows)
+
+    def trend(self, last_day: dt.date, days: int = 7) -> pd.DataFrame:
+        """Production per day for the ``days`` days ending on ``last_day``.
+
+        Days with no rows in the store are left out.
+        """
+        first_day = last_day - dt.timedelta(days=days - 1)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                TREND, (first_day.isoformat(), last_day.isoformat())
+            ).fetchall()
+        index = pd.DatetimeIndex([row[0] for row in rows], name="day")
+        return pd.DataFrame(
+            [row[1:] for row in rows], index=index, columns=TREND_COLUMNS, dtype=float
+        )
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Shift windows and shift-boundary lookups on minute indexed data"""
+from __future__ import annotations
+
+import datetime as dt
+
+from typing import List, Mapping, NamedTuple, Sequence
+
+import pandas as pd
+
+
+class Shift(NamedTuple):
+    name: str
+    start: dt.time
+    hours: int = 12
+
+
+class ShiftWindow(NamedTuple):
+    name: str
+    start: dt.datetime
+    end: dt.datetime
+
+
+SHIFTS = (Shift("shift_1", dt.time(7)), Shift("shift_2", dt.time(19)))
+
+
+def shift_windows(report_day, shifts: Sequence[Shift] = SHIFTS) -> List[ShiftWindow]:
+    """Start and end of each shift worked on ``report_day``."""
+    day = pd.Timestamp(report_day).normalize()
+    windows = []
+    for shift in shifts:
+        start = day + pd.Timedelta(hours=shift.start.hour, minutes=shift.start.minute)
+        end = start + pd.Timedelta(hours=shift.hours)
+        windows.append(ShiftWindow(shift.name, start, end))
+    return windows
+
+
+def boundary_table(
+    frames: Mapping[str, pd.DataFrame], report_day, shifts: Sequence[Shift] = SHIFTS
+) -> pd.DataFrame:
+    """Shift end values for many locations, indexed by ``(location, shift)``.
+
+    Locations without a row at a shift end get ``NaN`` for that shift.
+    """
+    windows = shift_windows(report_day, shifts)
+    ends = pd.DatetimeIndex([window.end for window in windows])
+    names = [window.name for window in windows]
+    tables = {
+        location: data.reindex(ends).set_axis(names, axis=0)
+        for location, data in frames.items()
+    }
+    return pd.concat(tables, names=["location", "shift"])
@@ -6,6 +6,8 @@ from pathlib import Path
 import pytest
 import toml
 
+from synthetic_historian import SyntheticHistorian
+
 
 @pytest.fixture
 def report_config_folder():
@@ -22,3 +24,16 @@ def master_config(report_config_folder):
 @pytest.fixture
 def flare_config(report_config_folder):
     return None
+
+
+@pytest.fixture
+def historian(monkeypatch, tmp_path):
+    return SyntheticHistorian(locations=10).install(
+        monkeypatch, tmp_path / "rollup.sqlite"
+    )
+
+
+@pytest.fixture
+def config(historian):
+    """The fetch the report models read the synthetic historian through."""
+    return historian.get_location_data
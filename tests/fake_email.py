@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+from email.mime.multipart import MIMEMultipart
+
 
 class FakeMsg:
+    outbox = []
+
     def __init__(self, recipient_list, subject, signature="TEST"):
         self.sender = "testing"
         self.subject = subject
@@ -15,10 +19,17 @@ class FakeMsg:
     def send(self):
         pass
 
+    def deliver(self, message):
+        self.outbox.append((self.recipient_list, message))
+
     def construct_msg(self):
-        pass
+        msg = MIMEMultipart()
+        msg["Subject"] = self.subject
+        return msg
 
-    def convert_plots_to_attachment(self, figure_name, figures):
+    def convert_plots_to_attachment(
+        self, figure_name, figures, processes=None, fast=False, cache=None
+    ):
         self.attach_file(figure_name, figures, "pdf")
 
     def attach_file(self, attachment_name, file, file_type):
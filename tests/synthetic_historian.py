@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Deterministic stand-in for the historian and tag configuration of a site"""
+from __future__ import annotations
+
+import functools
+import zlib
+
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+CHEMICALS = ("a", "b", "c", "d", "e")
+EPOCH = pd.Timestamp("2000-01-01")
+TANK_CAPACITY = 500.0
+
+
+class SyntheticLocation(NamedTuple):
+    name: str
+    connection_type: str
+    designation: str
+    trucked: str
+    has_inlet: bool
+    has_discharge: bool
+    inlets: int
+
+
+def _seed(tag: str, seed: int) -> int:
+    return zlib.crc32(tag.encode("utf8")) ^ seed
+
+
+def _noise(minutes: np.ndarray, seed: int) -> np.ndarray:
+    """Repeatable noise in [-0.5, 0.5) for absolute minute numbers."""
+    value = np.sin(minutes * 12.9898 + (seed % 10_000) * 78.233) * 43758.5453
+    return value - np.floor(value) - 0.5
+
+
+class SyntheticHistorian:
+    """Minute data and tag lookups for ``locations`` made up locations.
+
+    Values depend only on the tag and the minute, so any two windows over the
+    same tag agree where they overlap. Flowrates follow a daily cycle, tanks
+    drain and refill a few times a day and pipeline pressures have one column
+    per inlet. Every location is piped; trucked data is shaped by the
+    historian's ticket handling, which this does not model.
+    """
+
+    def __init__(self, locations: int = 10, seed: int = 0):
+        self.seed = seed
+        self.records = {}
+        for idx in range(locations):
+            location = f"Location_{idx:03d}"
+            self.records[location] = SyntheticLocation(
+                name=f"Location {idx:03d}",
+                connection_type="connection_1" if idx % 4 == 3 else "connection_2",
+                designation="UPPER" if idx % 2 == 0 else "LOWER",
+                trucked="NO",
+                has_inlet=idx % 5 != 4,
+                has_discharge=idx % 3 != 2,
+                inlets=1 + idx % 3,
+            )
+
+    @property
+    def tags(self):
+        return list(self.records.items())
+
+    def _tag(self, location, kind):
+        return f"{location}.{kind}"
+
+    def name(self, location):
+        return self.records[location].name
+
+    def connection_type(self, location):
+        return self.records[location].connection_type
+
+    def designation(self, location):
+        return self.records[location].designation
+
+    def trucked(self, location):
+        return self.records[location].trucked
+
+    def inlet_flowrate(self, location) -> Optional[str]:
+        if self.records[location].has_inlet:
+            return self._tag(location, "inlet_flowrate")
+        return None
+
+    def discharge_flowrate(self, location) -> Optional[str]:
+        if self.records[location].has_discharge:
+            return self._tag(location, "discharge_flowrate")
+        return None
+
+    def fuel_flowrate(self, location):
+        return self._tag(location, "fuel_flowrate")
+
+    fuel = fuel_flowrate
+
+    def product_flowrate(self, location):
+        return self._tag(location, "product_flowrate")
+
+    def product_tank_volume(self, location):
+        return self._tag(location, "product_tank_volume")
+
+    def pipeline_pressure(self, location) -> List[str]:
+        inlets = self.records[location].inlets
+        return [self._tag(location, f"pressure_{inlet}") for inlet in range(inlets)]
+
+    def inlet_names(self, location) -> List[str]:
+        return [f"Inlet {inlet + 1}" for inlet in range(self.records[location].inlets)]
+
+    def __getattr__(self, attr):
+        for chemical in CHEMICALS:
+            if attr == f"chemical_{chemical}":
+                return lambda location: f"Chemical {chemical.upper()}"
+            if attr == f"chemical_{chemical}_volume":
+                return functools.partial(self._tag, kind=f"chemical_{chemical}_volume")
+        raise AttributeError(attr)
+
+    def series(self, tag: Optional[str], index: pd.DatetimeIndex) -> np.ndarray:
+        if tag is None:
+            # Locations without the instrument read as an empty column.
+            return np.full(len(index), np.nan)
+        minutes = ((index - EPOCH) // pd.Timedelta(minutes=1)).to_numpy(float)
+        seed = _seed(tag, self.seed)
+        kind = tag.rsplit(".", 1)[-1]
+        if kind.endswith("_volume"):
+            period = 360 + seed % 360
+            phase = (minutes + seed % period) % period
+            drain = period * 0.9
+            level = np.where(
+                phase < drain,
+                TANK_CAPACITY * (1 - 0.8 * phase / drain),
+                TANK_CAPACITY * (0.2 + 0.8 * (phase - drain) / (period - drain)),
+            )
+            return level + _noise(minutes, seed)
+        if kind.startswith("pressure"):
+            return 300 + 40 * _noise(minutes, seed)
+        if kind == "product_flowrate":
+            # A few thousand gallons a day, in line with the report's axes.
+            base = 0.5 + (seed % 200) / 100
+        else:
+            base = 50 + seed % 450
+        daily = np.sin(2 * np.pi * minutes / 1440 + seed % 7)
+        return base * (1 + 0.2 * daily + 0.1 * _noise(minutes, seed))
+
+    def get_location_data(
+        self, location, tags, cols, start_date, end_date, trucked, sum_values=True
+    ):
+        index = pd.date_range(start_date, end_date, freq="min")
+        data = {}
+        for tag, col in zip(tags, cols):
+            if isinstance(tag, (list, tuple)) and not sum_values:
+                for sub_tag, sub_col in zip(tag, col):
+                    data[sub_col] = self.series(sub_tag, index)
+            elif isinstance(tag, (list, tuple)):
+                data[col] = sum(self.series(sub_tag, index) for sub_tag in tag)
+            else:
+                data[col] = self.series(tag, index)
+        return pd.DataFrame(data, index=index)
+
+    def registry(self):
+        from reports.utilities.registry import Registry
+
+        return Registry.build(self.tags, self)
+
+    def patch(self, monkeypatch, *modules):
+        """Serve the tag registry and the fetch of ``modules`` from this historian."""
+        from reports.utilities import registry
+
+        monkeypatch.setattr(registry, "REGISTRY", self.registry())
+        for module in modules:
+            if hasattr(module, "get_location_data"):
+                monkeypatch.setattr(module, "get_location_data", self.get_location_data)
+
+    def install(self, monkeypatch, rollup_db):
+        """Patch the three report models, keeping the rollup at ``rollup_db``."""
+        from reports.models import (
+            location_consumption_model,
+            location_production_model,
+            summary_production_model,
+        )
+        from reports.utilities.rollup_store import RollupStore
+
+        self.patch(
+            monkeypatch,
+            summary_production_model,
+            location_consumption_model,
+            location_production_model,
+        )
+        monkeypatch.setattr(
+            summary_production_model,
+            "RollupStore",
+            functools.partial(RollupStore, rollup_db),
+        )
+        return self
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+
+from fake_email import FakeMsg
+from reports.controllers import run_report
+from reports.email import email_utils
+from reports.utilities.checkpoints import STAGES, RunFolder
+
+
+class FailingMsg(FakeMsg):
+    def deliver(self, message):
+        raise ConnectionError("smtp is down")
+
+
+def test_fresh_run_clears_the_folder_and_resume_keeps_it(tmp_path):
+    run = RunFolder(tmp_path, "run")
+    run.save("figures.pickle", [1, 2])
+    run.complete("fetch")
+    run.complete("model")
+
+    resumed = RunFolder(tmp_path, "run", resume=True)
+    assert resumed.next_stage() == "render"
+    assert resumed.load("figures.pickle") == [1, 2]
+
+    fresh = RunFolder(tmp_path, "run")
+    assert fresh.next_stage() == STAGES[0]
+    assert not fresh.path("figures.pickle").exists()
+
+
+def test_prune_keeps_recent_runs_and_the_current_one(tmp_path):
+    old = time.time() - 30 * 24 * 3600
+    for name in ("old_run", "recent_run", "current_run"):
+        (tmp_path / name).mkdir()
+    os.utime(tmp_path / "old_run", (old, old))
+    current = RunFolder(tmp_path, "current_run", resume=True)
+    os.utime(current.dir, (old, old))
+
+    current.prune(keep_days=14)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "current_run",
+        "recent_run",
+    ]
+
+
+def render_pdf(file, figures, *args, **kwargs):
+    for _ in figures:
+        pass
+    file.write_bytes(b"%PDF")
+
+
+def test_resume_picks_up_after_the_last_completed_stage(monkeypatch, tmp_path, config):
+    run_dir = tmp_path / "runs"
+    monkeypatch.setattr(FakeMsg, "outbox", [])
+    monkeypatch.setattr(email_utils, "EmailMsg", FailingMsg)
+    # The pages themselves are covered by the end-to-end report test.
+    monkeypatch.setattr(run_report, "render_pdf", render_pdf)
+    with pytest.raises(ConnectionError):
+        run_report.generate_master(
+            minute_store=None,
+            metrics_dir=tmp_path,
+            fetch=config,
+            page_cache=None,
+            run_dir=run_dir,
+        )
+    (folder,) = run_dir.iterdir()
+    assert (folder / "message.eml").exists()
+    assert not (folder / "send.done").exists()
+
+    def no_fetch(*args, **kwargs):
+        raise AssertionError("resumed run fetched again")
+
+    monkeypatch.setattr(email_utils, "EmailMsg", FakeMsg)
+    monkeypatch.setattr(run_report.DayCube, "build", no_fetch)
+    monkeypatch.setattr(run_report, "render_pdf", no_fetch)
+    run_report.generate_master(
+        minute_store=None,
+        metrics_dir=tmp_path,
+        fetch=no_fetch,
+        page_cache=None,
+        run_dir=run_dir,
+        resume=True,
+    )
+    (sent,) = FakeMsg.outbox
+    assert sent[1] == (folder / "message.eml").read_text()
+    assert RunFolder(run_dir, folder.name, resume=True).next_stage() is None
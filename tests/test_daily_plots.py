@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from reports.templates import daily_plots
+
+INDEX = pd.date_range("2021-08-01", periods=1441, freq="min")
+
+
+def png(figure):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=50)
+    plt.close(figure)
+    return buffer.getvalue()
+
+
+def test_fast_inlet_plot_draws_the_same_page():
+    flow = pd.DataFrame(
+        {
+            "inlet_flowrate": np.linspace(100, 200, len(INDEX)),
+            "discharge_flowrate": 90.0,
+            "fuel_flowrate": 5.0,
+        },
+        index=INDEX,
+    )
+    pressure = pd.DataFrame({"Inlet 1": np.linspace(200, 300, len(INDEX))}, INDEX)
+    args = (flow, pressure, "Location A", 150.0, 5.0, 90.0, pd.Series([250.0]))
+
+    default, (_, default_psi) = daily_plots.inlet_plot(*args)
+    labels = [label.get_rotation() for label in default_psi.get_xticklabels()]
+    fast, (_, fast_psi) = daily_plots.inlet_plot(*args, fast=True)
+
+    assert [label.get_rotation() for label in fast_psi.get_xticklabels()] == labels
+    assert len(fast_psi.get_xticks()) < 100
+    assert png(fast) == png(default)
+
+
+def test_inlet_plot_without_inlet_data_keeps_the_default_axis():
+    flow = pd.DataFrame(
+        {"inlet_flowrate": np.nan, "fuel_flowrate": 5.0}, index=INDEX, dtype=float
+    )
+    args = (flow, pd.DataFrame(), "Location A", np.nan, 5.0, np.nan, pd.Series())
+
+    figure, (flow_axis, _) = daily_plots.inlet_plot(*args)
+
+    assert daily_plots.set_ticks(flow_axis, flow.inlet_flowrate, "flow") is None
+    plt.close(figure)
+
+
+def test_fast_product_plot_draws_the_same_page():
+    df = pd.DataFrame(
+        {
+            "product_per_M": np.linspace(0.2, 0.6, len(INDEX)),
+            "cum_product": np.linspace(0, 42 * 800, len(INDEX)),
+        },
+        index=INDEX,
+    )
+    args = (df, "Location B", 150.0, 0.4, 800.0)
+
+    default, _ = daily_plots.product_plot(*args)
+    fast, _ = daily_plots.product_plot(*args, fast=True)
+
+    assert png(fast) == png(default)
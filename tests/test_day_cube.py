@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from reports.utilities.day_cube import DayCube
+from reports.utilities.fetch_pool import FetchRequest
+
+START = dt.datetime(2021, 8, 1)
+END = dt.datetime(2021, 8, 2)
+
+
+class CountingFetch:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, location, tags, cols, start_date, end_date, trucked, **kwargs):
+        self.calls.append((location, tuple(tags), start_date, end_date))
+        index = pd.date_range(start_date, end_date, freq="min")
+        # Each tag reads its own number on every minute except the first hour.
+        index = index[index >= START + dt.timedelta(hours=1)]
+        return pd.DataFrame(
+            {col: np.full(len(index), float(tag[-1])) for col, tag in zip(cols, tags)},
+            index=index,
+        )
+
+
+def plan():
+    return [
+        FetchRequest(
+            "Location_A", ["a1", "a2"], ["inlet", "product"], START, END, "NO"
+        ),
+        FetchRequest("Location_A", ["a1"], ["inlet"], START.replace(hour=6), END, "NO"),
+        FetchRequest("Location_B", ["b3"], ["inlet"], START, END, "NO"),
+        FetchRequest(
+            "Location_B", ["p0"], ["pressure"], START, END, "NO", sum_values=False
+        ),
+    ]
+
+
+def test_cube_fetches_each_location_once_and_serves_requests():
+    fetch = CountingFetch()
+    cube = DayCube.build(plan(), fetch, max_workers=2)
+    assert sorted(call[:2] for call in fetch.calls) == [
+        ("Location_A", ("a1", "a2")),
+        ("Location_B", ("b3",)),
+    ]
+
+    data = cube.get_location_data(
+        "Location_A", ["a2", "a1"], ["product", "inlet"], START, END, "NO"
+    )
+    assert list(data.columns) == ["product", "inlet"]
+    assert data.index[0] == START + dt.timedelta(hours=1)
+    assert (data["product"] == 2).all() and (data["inlet"] == 1).all()
+
+    cube.get_location_data("Location_B", ["p0"], ["pressure"], START, END, "NO", False)
+    assert fetch.calls[-1][:2] == ("Location_B", ("p0",))
+    assert cube.stats == {"served": 1, "fetched": 1}
+
+
+def test_reduce_across_locations_skips_invalid_minutes():
+    cube = DayCube.build(plan(), CountingFetch(), max_workers=2)
+
+    means = cube.reduce(
+        [
+            ("Location_A", "a2", "NO"),
+            ("Location_B", "b3", "NO"),
+            ("Location_C", "c", "NO"),
+        ],
+        START,
+        END,
+    )
+
+    assert means.iloc[:2].tolist() == [2, 3]
+    assert np.isnan(means["Location_C"])
+    assert not cube.view("Location_A", "a1", "NO", START, END)[2][:60].any()
+
+
+def outer_join_fetch(location, tags, cols, start_date, end_date, trucked, **kwargs):
+    index = pd.date_range(start_date, end_date, freq="min")
+    data = pd.DataFrame(
+        {col: np.full(len(index), float(tag[-1])) for col, tag in zip(cols, tags)},
+        index=index,
+    )
+    # a2 only reports during the first hour; minutes no tag has are left out.
+    for col, tag in zip(cols, tags):
+        if tag == "a2":
+            data.loc[index >= START + dt.timedelta(hours=1), col] = np.nan
+    return data.dropna(how="all")
+
+
+def test_combined_fetch_serves_the_rows_each_request_would_have_fetched():
+    cube = DayCube.build(plan(), outer_join_fetch, max_workers=2)
+
+    for tags, cols in ((["a2"], ["product"]), (["a1"], ["inlet"])):
+        served = cube.get_location_data("Location_A", tags, cols, START, END, "NO")
+        direct = outer_join_fetch("Location_A", tags, cols, START, END, "NO")
+        pd.testing.assert_frame_equal(served, direct, check_freq=False)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import datetime as dt
+import threading
+
+import numpy as np
+import pandas as pd
+
+from reports.utilities.derived import Derivation, DerivedColumns
+from reports.utilities.fetch_pool import FetchRequest
+
+START = dt.datetime(2021, 8, 1)
+END = dt.datetime(2021, 8, 2)
+
+
+class CountingCompute:
+    def __init__(self, scale):
+        self.scale = scale
+        self.calls = 0
+
+    def __call__(self, data, source):
+        self.calls += 1
+        return data[source].cumsum() * self.scale
+
+
+def fetch(location, tags, cols, start_date, end_date, trucked, **kwargs):
+    index = pd.date_range(start_date, end_date, freq="min")
+    return pd.DataFrame({col: np.ones(len(index)) for col in cols}, index=index)
+
+
+def request(start=START, end=END):
+    return FetchRequest("Location_A", ["flow"], ["product_flowrate"], start, end, "NO")
+
+
+def test_derived_columns_are_computed_once_per_window():
+    cum = CountingCompute(1)
+    cum_flow = Derivation(
+        ("cum_flow",), ("product_flowrate",), cum, ("product_flowrate",)
+    )
+    derived = DerivedColumns()
+
+    first = derived.frame(fetch, request(), [cum_flow])
+    second = derived.frame(fetch, request(), [cum_flow])
+    assert cum.calls == 1
+    assert first.equals(second)
+    assert derived.dependencies["cum_flow"] == ("product_flowrate",)
+
+    moved = derived.frame(fetch, request(START, END.replace(hour=8)), [cum_flow])
+    assert cum.calls == 2
+    assert moved.cum_flow.iloc[-1] == len(moved)
+
+
+def test_redefined_column_drops_its_dependants():
+    cum = CountingCompute(1)
+    doubled = CountingCompute(2)
+    cum_flow = Derivation(
+        ("cum_flow",), ("product_flowrate",), cum, ("product_flowrate",)
+    )
+    rescaled = Derivation(
+        ("cum_flow",), ("product_flowrate",), doubled, ("product_flowrate",)
+    )
+    total = CountingCompute(1)
+    cum_total = Derivation(("cum_total",), ("cum_flow",), total, ("cum_flow",))
+    derived = DerivedColumns()
+
+    derived.frame(fetch, request(), [cum_flow, cum_total])
+    data = derived.frame(fetch, request(), [rescaled, cum_total])
+
+    assert total.calls == 2
+    assert data.cum_total.iloc[-1] == data.cum_flow.sum()
+
+
+def test_a_slow_fetch_does_not_block_other_locations():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_fetch(location, *args, **kwargs):
+        if location == "Location_A":
+            started.set()
+            release.wait(5)
+        return fetch(location, *args, **kwargs)
+
+    cum_flow = Derivation(
+        ("cum_flow",), ("product_flowrate",), CountingCompute(1), ("product_flowrate",)
+    )
+    derived = DerivedColumns()
+    other = request()._replace(location="Location_B")
+    slow = threading.Thread(
+        target=derived.frame, args=(slow_fetch, request(), [cum_flow])
+    )
+    fast = threading.Thread(target=derived.frame, args=(slow_fetch, other, [cum_flow]))
+    slow.start()
+    started.wait(5)
+    fast.start()
+    fast.join(2)
+    finished_first = not fast.is_alive()
+    release.set()
+    slow.join(5)
+
+    assert finished_first
+    assert derived.stats["computed"] == 2
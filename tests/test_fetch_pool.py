@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import datetime as dt
+import time
+
+import pandas as pd
+import pytest
+
+from reports.utilities.fetch_pool import FetchRequest, prefetch
+
+START = dt.datetime(2021, 8, 1)
+END = dt.datetime(2021, 8, 2)
+
+
+def slow_fetch(location, tags, cols, start_date, end_date, trucked, **kwargs):
+    time.sleep(0.4)
+    return pd.DataFrame({col: [1.0] for col in cols}, index=[start_date])
+
+
+def request(location):
+    return FetchRequest(location, ["flow"], ["inlet_flowrate"], START, END, "NO")
+
+
+def hung_fetch(location, *args, **kwargs):
+    if location == "Location_B":
+        time.sleep(5)
+    return slow_fetch(location, *args, **kwargs)
+
+
+def test_each_request_gets_the_timeout_once_it_starts():
+    prefetched = prefetch(
+        [request("Location_A"), request("Location_B")],
+        slow_fetch,
+        max_workers=1,
+        timeout=0.6,
+    )
+
+    assert not prefetched.errors
+    assert len(prefetched.results) == 2
+
+
+def test_a_hung_request_times_out_without_holding_the_prefetch():
+    started = time.perf_counter()
+    prefetched = prefetch(
+        [request("Location_A"), request("Location_B")],
+        hung_fetch,
+        max_workers=2,
+        timeout=0.6,
+    )
+
+    assert time.perf_counter() - started < 1
+    data = prefetched.get_location_data(
+        "Location_A", ["flow"], ["inlet_flowrate"], START, END, "NO"
+    )
+    assert data.inlet_flowrate.tolist() == [1.0]
+    with pytest.raises(TimeoutError, match="Location_B"):
+        prefetched.get_location_data(
+            "Location_B", ["flow"], ["inlet_flowrate"], START, END, "NO"
+        )
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from reports.config import get_instrumentation, set_instrumentation
+from reports.utilities.instrumentation import rss, span
+
+
+def work():
+    with span("worker"):
+        pass
+
+
+def busy(seconds):
+    start = time.thread_time()
+    while time.thread_time() - start < seconds:
+        pass
+
+
+def test_spans_nest_and_write_json_and_table(tmp_path):
+    instrumentation = set_instrumentation(name="master_report")
+    try:
+        with span("fetch") as fetch_span:
+            fetch_span.add_rows(1440)
+        with span("model"):
+            for location in ("Location_A", "Location_B"):
+                with span(location) as location_span:
+                    location_span.add_rows(10)
+        worker = threading.Thread(target=work)
+        worker.start()
+        worker.join()
+    finally:
+        set_instrumentation(False)
+    instrumentation.finish()
+
+    json_file, table_file = instrumentation.write(tmp_path, "run")
+    tree = json.loads(json_file.read_text())
+    assert [child["name"] for child in tree["children"]] == ["fetch", "model", "worker"]
+    assert tree["children"][0]["rows"] == 1440
+    assert [child["rows"] for child in tree["children"][1]["children"]] == [10, 10]
+    assert "    Location_A" in table_file.read_text()
+    assert tree["wall"] >= tree["children"][1]["wall"]
+
+
+def test_span_is_a_no_op_when_off():
+    assert get_instrumentation() is None
+    with span("anything") as unused:
+        unused.add_rows(5)
+    assert get_instrumentation() is None
+
+
+def test_top_level_spans_count_the_cpu_of_worker_threads():
+    set_instrumentation(name="master_report")
+    try:
+        with span("model") as model_span:
+            with span("location") as location_span:
+                worker = threading.Thread(target=busy, args=(0.2,))
+                worker.start()
+                worker.join()
+    finally:
+        set_instrumentation(False)
+
+    assert model_span.cpu >= 0.15
+    assert location_span.cpu < 0.1
+
+
+def test_peak_rss_keeps_a_spike_freed_within_the_span():
+    pytest.importorskip("psutil")
+    set_instrumentation(name="master_report")
+    try:
+        with span("render") as render_span:
+            before = rss()
+            spike = np.ones(64 * 2**20 // 8)
+            time.sleep(0.1)
+            del spike
+    finally:
+        set_instrumentation(False)
+
+    assert render_span.rss_peak - before >= 48 * 2**20
+    assert rss() - before < 32 * 2**20
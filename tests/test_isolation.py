@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import datetime as dt
+import time
+
+import matplotlib.pyplot as plt
+import pytest
+
+from reports.controllers import run_report
+from reports.models import location_consumption_model, location_production_model
+from reports.templates.figure_spec import FigureSpec
+from reports.templates.render import build_figure
+from reports.utilities import registry
+from reports.utilities.isolation import (
+    DeadlineExceeded,
+    DegradedLocations,
+    call_with_deadline,
+    run_deadline,
+)
+from reports.utilities.registry import FIELDS, MISSING, Registry
+
+
+def test_call_with_deadline_gives_up_on_slow_work():
+    assert call_with_deadline(sum, 1, [1, 2]) == 3
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(time.sleep, 0.05, 1)
+    with pytest.raises(TimeoutError, match="historian"):
+        call_with_deadline(raise_timeout, 1)
+
+
+def raise_timeout():
+    raise TimeoutError("historian timed out")
+
+
+def test_a_failing_location_gets_no_data_pages(historian, monkeypatch):
+    bad = historian.tags[0][0]
+
+    def fetch(location, *args, **kwargs):
+        if location == bad:
+            raise KeyError(f"{location} has no tags")
+        return historian.get_location_data(location, *args, **kwargs)
+
+    degraded = DegradedLocations(timeout=60)
+    product, inlet = location_production_model.operation(fetch, degraded=degraded)
+
+    assert [failure.location for failure in degraded.failures] == [bad]
+    assert len(inlet) == len(historian.tags)
+    assert inlet[0] == FigureSpec(
+        "no_data_plot",
+        ("Location 000 Inlet Analysis", repr(KeyError(f"{bad} has no tags"))),
+    )
+    assert all(figure.template == "inlet_plot" for figure in inlet[1:])
+    assert product[0].template == "no_data_plot"
+    assert "Location 000" in degraded.summary()
+
+
+def test_a_failing_template_renders_a_no_data_page():
+    figure = build_figure(FigureSpec("inlet_plot", (None, None, "Location A")))
+
+    assert figure.texts[0].get_text() == "Location A Inlet Analysis"
+    plt.close(figure)
+
+
+def test_locations_past_the_deadline_are_not_run():
+    degraded = DegradedLocations(deadline=dt.datetime.now() - dt.timedelta(seconds=1))
+
+    assert (
+        degraded.run("model", "Location_A", pytest.fail, "ran past the deadline")
+        is None
+    )
+    assert "delivery deadline" in degraded.failures[0].error
+
+
+def test_a_failing_location_is_left_out_of_the_usage_charts(historian):
+    bad = historian.tags[0][0]
+
+    def fetch(location, *args, **kwargs):
+        if location == bad:
+            raise KeyError(f"{location} has no tags")
+        return historian.get_location_data(location, *args, **kwargs)
+
+    degraded = DegradedLocations(timeout=60)
+    (chemical_a, fuel), measured = location_consumption_model.operation(
+        fetch, degraded=degraded
+    )
+
+    names = [location for location, _ in historian.tags[1:]]
+    assert chemical_a.args[2] == fuel.args[2] == names
+    assert len(fuel.args[0]) == len(fuel.args[1]) == len(names)
+    assert not any(value != value for value in chemical_a.args[0] + fuel.args[0])
+    assert measured[0].template == "no_data_plot"
+
+
+def test_usage_charts_have_no_data_pages_when_every_location_fails(historian):
+    def fetch(location, *args, **kwargs):
+        raise TimeoutError("historian is down")
+
+    degraded = DegradedLocations(timeout=60)
+    usage, measured = location_consumption_model.operation(fetch, degraded=degraded)
+
+    assert usage == [
+        FigureSpec("no_data_plot", ("Daily CHEMICAL_A Usage Summary",)),
+        FigureSpec("no_data_plot", ("Daily FUEL Usage Summary",)),
+    ]
+    assert {figure.template for figure in measured} == {"no_data_plot"}
+    assert len(degraded.failures) == len(historian.tags)
+
+
+def test_a_deadline_past_at_the_start_of_the_run_is_dropped(caplog):
+    past = dt.datetime.now() - dt.timedelta(hours=1)
+    later = dt.datetime.now() + dt.timedelta(hours=1)
+
+    assert run_deadline(later, 600) == later
+    assert run_deadline(past, 600) is None
+    assert "passed before the run started" in caplog.text
+
+    degraded = DegradedLocations(timeout=60, deadline=run_deadline(past, 60))
+    assert degraded.run("location_production_model", "Location_A", len, "ab") == 2
+    assert not degraded
+
+
+def without_tags(built: Registry, location, *fields) -> Registry:
+    record = built[location]
+    values = tuple(
+        MISSING if name in fields else value
+        for name, value in zip(FIELDS, record.values)
+    )
+    return Registry(
+        record._replace(values=values) if other is record else other
+        for other in built.records.values()
+    )
+
+
+def test_a_location_missing_a_tag_is_degraded_not_the_run(historian, monkeypatch):
+    bad = historian.tags[0][0]
+    monkeypatch.setattr(
+        registry,
+        "REGISTRY",
+        without_tags(
+            registry.get_registry(), bad, "fuel_flowrate", "product_tank_volume"
+        ),
+    )
+
+    requests = [
+        request for request in run_report.fetch_plans() if request.location == bad
+    ]
+    assert [request.cols for request in requests] == [
+        ["inlet_flowrate", "chemical_a_vol"],
+        [["Inlet 1"]],
+    ]
+
+    degraded = DegradedLocations(timeout=60)
+    (chemical_a, fuel), measured = location_consumption_model.operation(
+        historian.get_location_data, degraded=degraded
+    )
+    assert [failure.location for failure in degraded.failures] == [bad]
+    assert "has no fuel_flowrate tag" in degraded.failures[0].error
+    assert bad not in fuel.args[2]
+    assert measured[0].template == "no_data_plot"
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import logging
+
+from reports.utilities.log_helper import ARGS_LIMIT, log_call
+
+
+class CountingRepr:
+    renders = 0
+
+    def __repr__(self):
+        CountingRepr.renders += 1
+        return "x" * 10 * ARGS_LIMIT
+
+
+def test_disabled_logger_renders_nothing():
+    logger = logging.getLogger("test_log_helper.disabled")
+    logger.setLevel(logging.WARNING)
+
+    @log_call(logger=logger, timing=True, memory=True)
+    def add(a, b):
+        return a + b
+
+    CountingRepr.renders = 0
+    assert add(1, 2) == 3
+    assert len(add([CountingRepr()], [])) == 1
+    assert CountingRepr.renders == 0
+
+
+def test_enabled_logger_caps_args_and_adds_fields(caplog):
+    logger = logging.getLogger("test_log_helper.enabled")
+
+    @log_call(logger=logger, timing=True, memory=True)
+    def echo(value):
+        return value
+
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        echo(CountingRepr())
+
+    calling, done = [record.getMessage() for record in caplog.records]
+    assert len(calling) < 2 * ARGS_LIMIT
+    assert "wall=" in done and "peak=" in done
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reports.utilities.minute_store import MinuteStore
+
+TODAY = pd.Timestamp(dt.datetime.today()).normalize()
+DAY = pd.Timedelta(days=1)
+
+
+class StubHistorian:
+    """Minute values equal to the minute number, recording every request."""
+
+    def __init__(self, columns=("flow",)):
+        self.columns = list(columns)
+        self.gaps = pd.DatetimeIndex([])
+        self.requests = []
+
+    def get_location_data(
+        self, location, tags, cols, start_date, end_date, trucked, sum_values=True
+    ):
+        self.requests.append((pd.Timestamp(start_date), pd.Timestamp(end_date)))
+        index = pd.date_range(start_date, end_date, freq="min")
+        index = index[~index.isin(self.gaps)]
+        minutes = (index - TODAY) // pd.Timedelta(minutes=1)
+        return pd.DataFrame(
+            {
+                col: minutes.to_numpy(float) + idx
+                for idx, col in enumerate(self.columns)
+            },
+            index=index,
+        )
+
+
+@pytest.fixture
+def historian():
+    return StubHistorian()
+
+
+@pytest.fixture
+def store(tmp_path, historian):
+    return MinuteStore(tmp_path, historian.get_location_data)
+
+
+def read(store, start, end):
+    return store.get_location_data(
+        "Location_A",
+        ["tag"],
+        ["flow"],
+        start.to_pydatetime(),
+        end.to_pydatetime(),
+        "NO",
+    )
+
+
+def test_a_stored_day_is_read_back_without_fetching(store, historian):
+    start, end = TODAY - 3 * DAY, TODAY - DAY
+    first = read(store, start, end)
+    second = read(store, start, end)
+
+    assert len(historian.requests) == 1
+    pd.testing.assert_frame_equal(second, first, check_freq=False)
+    pd.testing.assert_frame_equal(
+        first, historian.get_location_data(None, None, None, start, end, None)
+    )
+
+
+def test_today_is_always_fetched(store, historian):
+    start, end = TODAY - DAY, TODAY + pd.Timedelta(hours=6)
+    read(store, start, end)
+    data = read(store, start, end)
+
+    assert historian.requests[-1] == (TODAY, end)
+    assert data.index[-1] == end
+
+
+def test_missing_days_are_fetched_in_consecutive_runs(store, historian):
+    for day in (TODAY - 5 * DAY, TODAY - 3 * DAY):
+        read(store, day, day + pd.Timedelta(hours=23, minutes=59))
+    historian.requests.clear()
+
+    data = read(store, TODAY - 5 * DAY, TODAY - DAY)
+
+    last_minute = pd.Timedelta(hours=23, minutes=59)
+    assert historian.requests == [
+        (TODAY - 4 * DAY, TODAY - 4 * DAY + last_minute),
+        (TODAY - 2 * DAY, TODAY - DAY + last_minute),
+    ]
+    assert data.index.is_monotonic_increasing
+    assert len(data) == 4 * 1440 + 1
+
+
+def test_a_day_with_gaps_is_fetched_again(store, historian):
+    start, end = TODAY - 2 * DAY, TODAY - DAY
+    historian.gaps = pd.date_range(
+        start + pd.Timedelta(hours=3), periods=30, freq="min"
+    )
+    assert len(read(store, start, end)) == 1441 - 30
+
+    historian.gaps = pd.DatetimeIndex([])
+    assert len(read(store, start, end)) == 1441
+    assert len(historian.requests) == 2
+    read(store, start, end)
+    assert len(historian.requests) == 2
+
+
+def test_a_new_column_layout_clears_the_stored_days(store, historian, tmp_path):
+    start, end = TODAY - 3 * DAY, TODAY + pd.Timedelta(hours=6)
+    read(store, start, end)
+    historian.columns = ["inlet_1", "inlet_2"]
+
+    data = read(store, start, end)
+
+    assert list(data.columns) == ["inlet_1", "inlet_2"]
+    assert np.array_equal(data.inlet_2, data.inlet_1 + 1)
+    assert historian.requests[-1] == (start, end)
+    (folder,) = (tmp_path / "Location_A").iterdir()
+    assert (folder / "columns.json").read_text() == '["inlet_1", "inlet_2"]'
+    assert not list(folder.glob("*.npy"))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pypdf import PdfReader
+from reports.templates import render
+from reports.templates.figure_spec import FigureSpec
+from reports.templates.page_cache import PageCache
+
+
+def consum_spec(scale=1.0):
+    return FigureSpec(
+        "consum_plot",
+        ([1.0 * scale, 2.0], [3.0, 4.0], ["Location A", "Location B"], "fuel"),
+    )
+
+
+def test_key_follows_the_content_of_the_call(tmp_path):
+    cache = PageCache(tmp_path)
+    index = pd.date_range("2021-08-01", periods=3, freq="min")
+    frame = pd.DataFrame({"inlet_flowrate": np.arange(3.0)}, index=index)
+    spec = FigureSpec("product_plot", (frame, "Location A", 1.0, 2.0, 3.0))
+
+    assert cache.key(spec, 300, False) == cache.key(spec._replace(), 300, False)
+    assert cache.key(spec, 300, False) != cache.key(spec, 300, True)
+    changed = spec._replace(args=(frame * 2,) + spec.args[1:])
+    assert cache.key(changed, 300, False) != cache.key(spec, 300, False)
+    assert (
+        cache.key(FigureSpec("product_plot", (threading.Lock(),)), 300, False) is None
+    )
+
+
+def test_rerun_only_renders_changed_pages(tmp_path, monkeypatch):
+    rendered = []
+    render_page = render.render_page
+
+    def counting_render_page(figure, dpi=render.DPI, fast=False):
+        rendered.append(figure.args[0][0])
+        return render_page(figure, dpi, fast)
+
+    monkeypatch.setattr(render, "render_page", counting_render_page)
+    cache = PageCache(tmp_path / "pages")
+
+    render.render_pdf(
+        tmp_path / "first.pdf", [consum_spec(1), consum_spec(2)], dpi=50, cache=cache
+    )
+    render.render_pdf(
+        tmp_path / "second.pdf", [consum_spec(1), consum_spec(3)], dpi=50, cache=cache
+    )
+
+    assert rendered == [1.0, 2.0, 3.0]
+    assert len(PdfReader(tmp_path / "second.pdf").pages) == 2
+    assert cache.report()["hits"] == 1
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert list((tmp_path / "pages").glob("*/*.pdf")) == []
+
+
+def test_keys_change_with_the_page_rendering(tmp_path, monkeypatch):
+    before = PageCache(tmp_path).key(consum_spec(), 300, False)
+    read_bytes = Path.read_bytes
+
+    def edited(path):
+        data = read_bytes(path)
+        return data + b"# edited" if path.name == "render.py" else data
+
+    monkeypatch.setattr(Path, "read_bytes", edited)
+
+    assert PageCache(tmp_path).key(consum_spec(), 300, False) != before
+
+
+def test_pool_pages_stream_in_order_within_the_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(render, "render_page", lambda figure, dpi, fast: b"%d" % figure)
+    read = []
+
+    def figures():
+        for number in range(10):
+            read.append(number)
+            yield number
+
+    with ThreadPoolExecutor(2) as pool:
+        pages = render.cached_pages(figures(), PageCache(tmp_path), pool=pool, window=3)
+        assert next(pages) == b"0"
+        assert len(read) <= 4
+        assert list(pages) == [b"%d" % number for number in range(1, 10)]
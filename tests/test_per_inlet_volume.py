@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+
+from reports.models.location_consumption_model import per_inlet_volume
+
+
+def test_level_based_skips_shifts_without_inlet():
+    shift_1, shift_2 = per_inlet_volume(
+        [2.0, 2.0, 0.0], [4.0, 4.0, 0.0], "level_based", [1000, 0, 0], [2000, 4000, 0]
+    )
+
+    np.testing.assert_allclose(shift_1, [2.0, 0.0, 0.0])
+    np.testing.assert_allclose(shift_2, [2.0, 1.0, 0.0])
+
+
+def test_flow_based_uses_shift_differences():
+    shift_1, shift_2 = per_inlet_volume(
+        [1.0, 1.0, 1.0, np.nan],
+        [3.0, np.nan, 3.0, np.nan],
+        "flow_based",
+        [100.0, 100.0, 100.0, np.nan],
+        [300.0, np.nan, 100.0, np.nan],
+    )
+
+    np.testing.assert_allclose(shift_1, [10.0, 10.0, 0.0, 0.0])
+    np.testing.assert_allclose(shift_2, [10.0, 0.0, 0.0, 0.0])
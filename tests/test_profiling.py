@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pstats
+import time
+
+from reports.config import set_instrumentation
+from reports.utilities.instrumentation import span
+from reports.utilities.profiling import StageProfiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def run_stages(profiler):
+    set_instrumentation(name="test").listeners.append(profiler)
+    try:
+        for stage in ("fetch", "render"):
+            with span(stage):
+                with span("inner"):
+                    busy(0.05)
+    finally:
+        set_instrumentation(False)
+    return profiler.stop()
+
+
+def test_cprofile_writes_one_pstats_file_per_stage(tmp_path):
+    files = run_stages(StageProfiler(tmp_path, "cprofile").start())
+
+    assert [file.name for file in files] == ["01_fetch.pstats", "02_render.pstats"]
+    stats = pstats.Stats(str(files[0]))
+    assert any(name == "busy" for _, _, name in stats.stats)
+
+
+def test_sampling_writes_collapsed_stacks_by_stage(tmp_path):
+    files = run_stages(StageProfiler(tmp_path, "sampling", interval=0.001).start())
+
+    lines = files[0].read_text().splitlines()
+    stages = {line.split(";", 1)[0] for line in lines}
+    assert {"fetch", "render"} <= stages
+    assert any("test_profiling:busy" in line for line in lines)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+from reports.utilities import registry
+from reports.utilities.registry import Registry, field
+
+
+class Tags:
+    """Tag lookups that count calls and have no chemical B at Location_B."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def connection_type(self, location):
+        self.calls += 1
+        return "connection_1" if location == "Location_C" else "connection_2"
+
+    def inlet_flowrate(self, location):
+        return f"{location}.inlet"
+
+    def discharge_flowrate(self, location):
+        return None if location == "Location_A" else f"{location}.discharge"
+
+    def fuel_flowrate(self, location):
+        return f"{location}.fuel"
+
+    def pipeline_pressure(self, location):
+        return [] if location == "Location_B" else [f"{location}.psi"]
+
+    def chemical_b_volume(self, location):
+        if location == "Location_B":
+            raise KeyError(location)
+        return f"{location}.chemical_b"
+
+
+LOCATIONS = ("Location_A", "Location_B", "Location_C", "Location_I")
+LISTING = [(location, None) for location in LOCATIONS]
+
+
+def test_build_looks_up_each_tag_once_and_groups_locations():
+    tags = Tags()
+    built = Registry.build(LISTING, tags)
+    assert tags.calls == len(LISTING)
+
+    assert built.locations == LOCATIONS
+    assert built.production == ("Location_A", "Location_B", "Location_I")
+    assert built.consumption == ("Location_A", "Location_B")
+    assert built.full_flow == ("Location_B", "Location_C", "Location_I")
+    assert built.with_pressure == ("Location_A", "Location_C", "Location_I")
+    assert built["Location_A"].get("chemical_b_volume") == "Location_A.chemical_b"
+    with pytest.raises(KeyError):
+        built["Location_B"].get("chemical_b_volume")
+    with pytest.raises(KeyError):
+        built["Location_A"].get("chemical_c_volume")
+
+
+def test_field_reads_the_shared_registry(monkeypatch):
+    monkeypatch.setattr(registry, "REGISTRY", Registry.build(LISTING, Tags()))
+    connection_type = field("connection_type")
+
+    assert connection_type("Location_C") == "connection_1"
+    assert [connection_type(location) for location in registry.get_registry()] == [
+        "connection_2",
+        "connection_2",
+        "connection_1",
+        "connection_2",
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from pypdf import PdfReader
+from reports.templates import render
+from reports.templates.figure_spec import FigureSpec
+
+
+def page_texts(file):
+    return [page.extract_text() for page in PdfReader(file).pages]
+
+
+def test_pool_renders_the_same_pages_in_the_same_order(tmp_path):
+    figures = [
+        FigureSpec("no_data_plot", (f"Location {number} Inlet Analysis", None))
+        for number in range(7)
+    ]
+
+    render.render_pdf(tmp_path / "serial.pdf", list(figures), dpi=50)
+    render.render_pdf(tmp_path / "pool.pdf", iter(figures), processes=2, dpi=50)
+
+    serial, pool = page_texts(tmp_path / "serial.pdf"), page_texts(
+        tmp_path / "pool.pdf"
+    )
+    assert len(pool) == len(serial) == len(figures)
+    assert pool == serial
+    assert all(f"Location {number} " in text for number, text in enumerate(pool))
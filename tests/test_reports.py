@@ -1,14 +1,70 @@
 # -*- coding: utf-8 -*-
 """This has end-to-end tests (except for email stuff)"""
+
 from __future__ import annotations
 
+import pytest
+
 from fake_email import FakeMsg
 from reports.controllers import run_report
-from reports.services.email import email_utils
+from reports.email import email_recips, email_utils
 
 
-def test_master_report(monkeypatch, config):
+@pytest.mark.functional
+@pytest.mark.slow
+def test_master_report(monkeypatch, tmp_path, config):
     """Tests if this the report runs if this errors out then something is wrong"""
     with monkeypatch.context() as m:
         m.setattr(email_utils, "EmailMsg", FakeMsg)
-        run_report.generate_master(config)
+        run_report.generate_master(
+            minute_store=None,
+            metrics_dir=tmp_path,
+            fetch=config,
+            page_cache=None,
+            run_dir=tmp_path / "runs",
+        )
+
+
+def test_summary_edition_goes_to_supervisors_first(monkeypatch, tmp_path, config):
+    monkeypatch.setattr(FakeMsg, "outbox", [])
+    monkeypatch.setattr(email_utils, "EmailMsg", FakeMsg)
+    pages = []
+
+    def render_pdf(file, figures, *args, **kwargs):
+        pages.append([figure.template for figure in figures])
+        file.write_bytes(b"%PDF")
+
+    monkeypatch.setattr(run_report, "render_pdf", render_pdf)
+    builds = []
+    build = run_report.DayCube.build
+
+    def build_cube(requests, *args):
+        builds.append((len(FakeMsg.outbox), [request.key() for request in requests]))
+        return build(requests, *args)
+
+    monkeypatch.setattr(run_report.DayCube, "build", build_cube)
+    run_report.generate_master(
+        minute_store=None,
+        metrics_dir=tmp_path,
+        fetch=config,
+        page_cache=None,
+        run_dir=tmp_path / "runs",
+        summary_first=True,
+    )
+
+    summary, full = FakeMsg.outbox
+    assert summary[0] == email_recips.get_recipiant_list("supervisors")
+    assert "Subject: Production Summary" in summary[1]
+    assert full[0] == email_recips.get_recipiant_list("all")
+    assert pages[0] == ["product_summary_plot"]
+    assert pages[1][0] == "product_summary_plot"
+    assert {"inlet_plot", "product_plot"} <= set(pages[1])
+    # Only the summary model's data is fetched before the supervisors' email.
+    (before, summary_keys), (after, detail_keys) = builds
+    assert (before, after) == (0, 1)
+    assert summary_keys == [
+        request.key() for request in run_report.fetch_plans(run_report.MODELS[:1])
+    ]
+    assert detail_keys == [
+        request.key() for request in run_report.fetch_plans(run_report.MODELS[1:])
+    ]
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import datetime as dt
+
+from reports.utilities.rollup_store import LocationTotals, RollupStore
+
+DAY = dt.date(2021, 8, 1)
+
+
+def totals(scale=1.0):
+    return [
+        LocationTotals(
+            "Location_A", "A", "connection_2", "UPPER", 100 * scale, 90 * scale
+        ),
+        LocationTotals(
+            "Location_B", "B", "connection_1", "LOWER", 40 * scale, 35 * scale
+        ),
+    ]
+
+
+def test_trend_splits_location_types_per_day(tmp_path):
+    store = RollupStore(tmp_path / "rollup.sqlite")
+    store.write(DAY - dt.timedelta(days=1), totals(0.5))
+    store.write(DAY, totals())
+
+    trend = store.trend(DAY, days=7)
+
+    assert list(trend.index.date) == [DAY - dt.timedelta(days=1), DAY]
+    assert trend.location_type_a.tolist() == [50, 100]
+    assert trend.location_type_b.tolist() == [20, 40]
+    assert trend.total.tolist() == [70, 140]
+
+
+def test_rewriting_a_day_replaces_its_rows(tmp_path):
+    store = RollupStore(tmp_path / "rollup.sqlite")
+    store.write(DAY, totals())
+    store.write(DAY, totals(2))
+
+    trend = store.trend(DAY, days=1)
+
+    assert trend.total.tolist() == [280]
+
+
+def test_a_location_without_totals_keeps_its_row(tmp_path):
+    store = RollupStore(tmp_path / "rollup.sqlite")
+    store.write(DAY, totals())
+    failed = totals(2)
+    failed[0].product_total = failed[0].pumped = float("nan")
+
+    assert store.write(DAY, failed) == 1
+    trend = store.trend(DAY, days=1)
+
+    assert trend.location_type_a.tolist() == [100]
+    assert trend.location_type_b.tolist() == [80]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from reports.utilities.shifts import Shift, boundary_table, shift_windows
+
+START = dt.datetime(2021, 8, 1, 6)
+END = dt.datetime(2021, 8, 2, 8)
+
+
+def minute_data():
+    index = pd.date_range(START, END, freq="min")
+    return pd.DataFrame({"cumulative_fuel": np.arange(len(index), dtype=float)}, index)
+
+
+def test_configurable_shifts():
+    shifts = [Shift("days", dt.time(6), 8), Shift("nights", dt.time(14), 16)]
+    windows = shift_windows(START, shifts)
+
+    assert [window.end for window in windows] == [
+        dt.datetime(2021, 8, 1, 14),
+        dt.datetime(2021, 8, 2, 6),
+    ]
+
+
+def test_boundary_table_marks_missing_shifts():
+    data = minute_data()
+    table = boundary_table({"Location_A": data, "Location_B": data.iloc[:60]}, START)
+
+    assert table.loc[("Location_A", "shift_2"), "cumulative_fuel"] == 1500
+    assert table.loc["Location_B"].cumulative_fuel.isna().all()
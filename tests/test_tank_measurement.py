@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import datetime as dt
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from typer.testing import CliRunner
+
+from reports.bin import report_app
+from reports.spotfire import tank_measurement
+from reports.spotfire.tank_measurement import (
+    PairResult,
+    TankPair,
+    get_tank_volume,
+    run_parallel,
+    run_serial,
+)
+from reports.utilities import registry
+from reports.utilities.registry import Registry
+
+START = dt.datetime(2021, 8, 1, 7)
+END = dt.datetime(2021, 8, 2, 7)
+
+
+def fetch_tank_data(pair, start_date, end_date):
+    if pair.location == "Location_Broken":
+        raise RuntimeError("historian went away")
+    index = pd.date_range(start_date, end_date, freq="min")
+    phase = len(pair.location) + len(pair.chemical)
+    return pd.DataFrame(
+        {
+            "inlet_flowrate": np.full(len(index), 10.0),
+            "tank_volume": 50 + 40 * np.sin(np.arange(len(index)) / 60 + phase),
+        },
+        index=index,
+    )
+
+
+def infer_fill_and_drain(data, start_date, end_date):
+    if data.tank_volume.iloc[0] < 0:
+        raise KeyError("row_num")
+    fill = {"row_num": 1, "peak_min_time": data.tank_volume.idxmax()}
+    drain = {"row_num": 1, "peak_min_time": data.tank_volume.idxmin()}
+    return [fill], [drain], None
+
+
+def calculate_chemical_usage(valid_fwd_values, valid_bkwd_values):
+    return 12.5
+
+
+@pytest.fixture(autouse=True)
+def stub_historian(monkeypatch):
+    monkeypatch.setattr(tank_measurement, "fetch_tank_data", fetch_tank_data)
+    monkeypatch.setattr(tank_measurement, "infer_fill_and_drain", infer_fill_and_drain)
+    monkeypatch.setattr(
+        tank_measurement, "calculate_chemical_usage", calculate_chemical_usage
+    )
+    # Threads share the stubs with the test on every platform.
+    monkeypatch.setattr(tank_measurement, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+
+def pairs(*locations):
+    return [
+        TankPair(location, chemical, None, lambda location, tank=tank: tank)
+        for location in locations
+        for chemical, tank in (("chemical_a", "chem_a"), ("chemical_b", "chem_b"))
+    ]
+
+
+def test_parallel_and_serial_give_the_same_frames(tmp_path):
+    tanks = pairs("Location_A", "Location_B", "Location_C")
+
+    serial, serial_frames = run_serial(tanks, START, END, tmp_path, "parquet", None)
+    parallel, parallel_frames = run_parallel(
+        tanks, START, END, tmp_path, "parquet", 3, None
+    )
+
+    assert [result.status for result in parallel] == ["succeeded"] * len(tanks)
+    assert [result[:3] for result in parallel] == [result[:3] for result in serial]
+    assert len(parallel_frames) == len(serial_frames) == len(tanks)
+    for parallel_frame, serial_frame in zip(parallel_frames, serial_frames):
+        pd.testing.assert_frame_equal(parallel_frame, serial_frame)
+        assert parallel_frame.peak_locs.sum() == 2
+
+
+def test_a_failing_pair_does_not_affect_the_others(tmp_path):
+    tanks = pairs("Location_A", "Location_Broken", "Location_C")
+
+    results, _ = run_parallel(tanks, START, END, tmp_path, "csv", 3, 60)
+
+    statuses = {(result.location, result.chemical): result.status for result in results}
+    assert {key for key, status in statuses.items() if status == "failed"} == {
+        ("Location_Broken", "chemical_a"),
+        ("Location_Broken", "chemical_b"),
+    }
+    assert sorted(path.name for path in tmp_path.glob("*.csv")) == [
+        "Location_A_chem_a.csv",
+        "Location_A_chem_b.csv",
+        "Location_C_chem_a.csv",
+        "Location_C_chem_b.csv",
+    ]
+    failed, _ = [result for result in results if result.status == "failed"]
+    assert "historian went away" in failed.error
+
+
+def test_a_key_error_in_the_inference_fails_the_pair(monkeypatch, tmp_path):
+    def fetch_drained(pair, start_date, end_date):
+        data = fetch_tank_data(pair, start_date, end_date)
+        if pair.location == "Location_B":
+            data["tank_volume"] = -1.0
+        return data
+
+    monkeypatch.setattr(tank_measurement, "fetch_tank_data", fetch_drained)
+    tanks = pairs("Location_A", "Location_B")
+
+    for results, _ in (
+        run_serial(tanks, START, END, tmp_path, "parquet", None),
+        run_parallel(tanks, START, END, tmp_path, "parquet", 2, 60),
+    ):
+        assert [result.status for result in results] == [
+            "succeeded",
+            "succeeded",
+            "failed",
+            "failed",
+        ]
+
+
+class Tags:
+    """Tank tags of two locations; Location_B has no chemical B tank."""
+
+    def connection_type(self, location):
+        return "connection_2"
+
+    def trucked(self, location):
+        return "NO"
+
+    def inlet_flowrate(self, location):
+        return f"{location}.inlet"
+
+    def __getattr__(self, name):
+        def lookup(location):
+            if location == "Location_B" and name.startswith("chemical_b"):
+                raise KeyError(location)
+            return f"{location}.{name}"
+
+        if name.startswith("chemical_"):
+            return lookup
+        raise AttributeError(name)
+
+
+def test_only_pairs_missing_a_registry_tag_are_skipped(monkeypatch, tmp_path):
+    listing = [("Location_A", None), ("Location_B", None)]
+    monkeypatch.setattr(registry, "REGISTRY", Registry.build(listing, Tags()))
+
+    results = get_tank_volume(tmp_path)
+
+    statuses = {(result.location, result.chemical): result.status for result in results}
+    assert [key for key, status in statuses.items() if status != "succeeded"] == [
+        ("Location_B", "chemical_b")
+    ]
+    assert statuses[("Location_B", "chemical_b")] == "skipped"
+    assert len(list(tmp_path.glob("*.csv"))) == 9
+
+
+@pytest.mark.parametrize("status, exit_code", [("succeeded", 0), ("failed", 1)])
+def test_cli_exit_code_follows_the_pair_results(
+    monkeypatch, tmp_path, status, exit_code
+):
+    def get_tank_volume(*args, **kwargs):
+        return [PairResult("Location_A", "chemical_a", status, {"fetch": 0.1})]
+
+    monkeypatch.setattr(tank_measurement, "get_tank_volume", get_tank_volume)
+
+    result = CliRunner().invoke(
+        report_app.app, ["tank-volume", "--output-root", str(tmp_path)]
+    )
+
+    assert result.exit_code == exit_code